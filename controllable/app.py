@@ -1,4 +1,8 @@
 import sys
+import time
+
+# startup times are measured from here, before the heavy imports
+STARTED_AT = time.perf_counter()
 
 try:
     import cv2
@@ -16,24 +20,24 @@ except ImportError:
 from PyQt5 import QtGui
 from PyQt5.QtWidgets import QWidget, QApplication, QLabel, QVBoxLayout, QSizePolicy, QPushButton, QCheckBox
 from PyQt5.QtGui import QPixmap, QFont
-from PyQt5.QtCore import pyqtSlot, Qt
-from tqdm import tqdm
+from PyQt5.QtCore import pyqtSlot, Qt, QTimer
 import numpy as np
-import requests
 import sys
-import os
 
 from . import video_feed
+from .cli import create_tracker, parse_args
 
 
-MODEL_URL = "https://storage.googleapis.com/mediapipe-models/hand_landmarker/hand_landmarker/float16/latest/hand_landmarker.task"
-
 class App(QWidget):
-    def __init__(self) -> None:
+    def __init__(self, args=None) -> None:
         super().__init__()
+        self.args = args if args is not None else parse_args([])
         self.setWindowTitle("Controllable")
+        self.tracker, self.metrics_exporter = create_tracker(self.args, STARTED_AT)
+        # the preview keeps the aspect ratio of whatever the source delivers
+        frame_width, frame_height = self.tracker.cap.frame_size or (4, 3)
         self.display_width = 640
-        self.display_height = 480
+        self.display_height = round(self.display_width * frame_height / frame_width)
 
         self.header_text = QLabel("Controllable")
         self.header_text.setFont(QFont("", 20))
@@ -66,6 +70,17 @@ class App(QWidget):
         self.only_hand.setToolTip("Only shows the hand landmarkers in the video feed. Useful for demos.")
         self.only_hand.stateChanged.connect(self.on_only_hand_changed)
 
+        self.show_stats = QCheckBox("Show performance stats")
+        self.show_stats.setToolTip("Shows timings of every pipeline stage, frame rates and dropped frames.")
+        self.show_stats.stateChanged.connect(self.on_show_stats_changed)
+
+        self.stats_label = QLabel()
+        self.stats_label.setFont(QFont("monospace", 9))
+        self.stats_label.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        self.stats_label.hide()
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats)
+
         # placeholder for video feed
         pixmap = QPixmap(self.display_width, self.display_height)
         pixmap.fill(Qt.white)
@@ -82,26 +97,36 @@ class App(QWidget):
         vbox.addWidget(settings_header)
         vbox.addWidget(self.enable_dragging_box, alignment=Qt.AlignCenter)
         vbox.addWidget(self.only_hand, alignment=Qt.AlignCenter)
+        vbox.addWidget(self.show_stats, alignment=Qt.AlignCenter)
+        vbox.addWidget(self.stats_label)
         self.setLayout(vbox)
 
-        self.video_thread = video_feed.VideoThread()
+        self.video_thread = video_feed.VideoThread(tracker=self.tracker)
+        self.video_thread.preview_size = (self.display_width, self.display_height)
+        self.video_thread.preview_fps = self.args.preview_fps
+        self.metrics = self.tracker.metrics
         self.video_thread.change_pixmap_signal.connect(self.update_image)
         self.video_thread.change_text_signal.connect(self.change_text)
         self.video_thread.calibration_completed_signal.connect(self.calibration_completed)
         self.video_thread.start()
 
-        if "--only-hand" in sys.argv:
+        if self.args.only_hand:
             self.only_hand.setChecked(True)
-            self.video_thread.only_hand = True
+            self.tracker.only_hand = True
 
-        self.calibrated = False
+        if self.args.stats:
+            self.show_stats.setChecked(True)
 
-        # download model
-        if not os.path.exists("hand_landmarker.task"):
-            self.download_model()
+        self.calibrated = False
+        if not self.args.recalibrate and self.tracker.load_profile():
+            self.calibration_completed()
+            self.info_text.setText("Loaded your saved calibration. Press the start button to continue "
+                                   "or restart with --recalibrate to calibrate again.")
 
     def closeEvent(self, event) -> None:
         self.video_thread.stop()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
         event.accept()
 
     def on_calibrate(self):
@@ -110,8 +135,15 @@ class App(QWidget):
 
     @pyqtSlot(np.ndarray)
     def update_image(self, cv_img):
+        start = self.metrics.now()
         qt_img = self.convert_cv_qt(cv_img)
         self.image_label.setPixmap(qt_img)
+        self.video_thread.frame_shown()
+        self.metrics.record("convert", start)
+        self.metrics.tick("preview")
+
+    def update_stats(self):
+        self.stats_label.setText(self.metrics.format_text())
 
     @pyqtSlot(str)
     def change_text(self, new_text):
@@ -126,51 +158,52 @@ class App(QWidget):
         self.push_button.clicked.connect(self.begin)
 
     def begin(self):
-        self.video_thread.began_processing = True
+        self.tracker.began_processing = True
         self.info_text.setText("Running. Tap your index finger and thumb to click. Dragging can be enabled in the settings.")
         self.push_button.setText("Stop")
         self.push_button.clicked.disconnect()
         self.push_button.clicked.connect(self.stop)
 
     def stop(self):
-        self.video_thread.began_processing = False
+        self.tracker.began_processing = False
         self.info_text.setText("Stopped. Press the start button to start processing again.")
         self.push_button.setText("Start")
         self.push_button.clicked.disconnect()
         self.push_button.clicked.connect(self.begin)
 
-    def convert_cv_qt(self, cv_img):
-        rgb_image = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_image.shape
-        bytes_per_line = ch * w
-        convert_to_qt_format = QtGui.QImage(rgb_image.data, w, h, bytes_per_line, QtGui.QImage.Format_RGB888)
-        p = convert_to_qt_format.scaled(self.display_width, self.display_height, Qt.KeepAspectRatio)
-        return QPixmap.fromImage(p)
+    @staticmethod
+    def convert_cv_qt(cv_img):
+        """Wraps a BGR frame that VideoThread already scaled to the display size in a QPixmap."""
+        h, w, ch = cv_img.shape
+        if hasattr(QtGui.QImage, "Format_BGR888"):
+            image_format = QtGui.QImage.Format_BGR888
+        else:
+            # Qt before 5.14 has no BGR format
+            cv_img = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
+            image_format = QtGui.QImage.Format_RGB888
+        convert_to_qt_format = QtGui.QImage(cv_img.data, w, h, ch * w, image_format)
+        return QPixmap.fromImage(convert_to_qt_format)
 
     def on_dragging_changed(self, state):
-        self.video_thread.enable_dragging = (state == Qt.Checked)
+        self.tracker.enable_dragging = (state == Qt.Checked)
 
     def on_only_hand_changed(self, state):
-        self.video_thread.only_hand = (state == Qt.Checked)
-
-    def download_model(self):
-        fname = MODEL_URL.split("/")[-1]
-        resp = requests.get(MODEL_URL, stream=True)
-        total = int(resp.headers.get('content-length', 0))
-        with open(fname, 'wb') as file, tqdm(
-                desc=fname,
-                total=total,
-                unit='iB',
-                unit_scale=True,
-                unit_divisor=1024,
-        ) as bar:
-            for data in resp.iter_content(chunk_size=1024):
-                size = file.write(data)
-                bar.update(size)
+        self.tracker.only_hand = (state == Qt.Checked)
+
+    def on_show_stats_changed(self, state):
+        visible = (state == Qt.Checked)
+        # the exporters need the metrics even while the overlay is hidden
+        self.metrics.enabled = visible or self.metrics_exporter is not None
+        self.stats_label.setVisible(visible)
+        if visible:
+            self.stats_timer.start(500)
+        else:
+            self.stats_timer.stop()
 
 def main():
+    args = parse_args()
     app = QApplication(sys.argv)
-    a = App()
+    a = App(args)
     a.show()
     sys.exit(app.exec_())
 
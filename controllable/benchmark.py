@@ -0,0 +1,375 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from . import filters, injection, metrics, recording
+from .landmarkers import LandmarkResult
+from .mouse_interpolator import MouseInterpolator
+
+
+RESULTS_VERSION = 1
+FPS = 30.0
+
+# one right hand in normalized image coordinates around its wrist, fingers pointing up
+_HAND = np.array([
+    (0.0, 0.1), (-0.04, 0.07), (-0.06, 0.04), (-0.07, 0.01), (-0.075, -0.02),  # wrist, thumb
+    (-0.03, 0.0), (-0.03, -0.03), (-0.03, -0.06), (-0.03, -0.09),  # index finger
+    (-0.01, 0.0), (-0.01, -0.035), (-0.01, -0.07), (-0.01, -0.1),  # middle finger
+    (0.01, 0.0), (0.01, -0.03), (0.01, -0.06), (0.01, -0.09),  # ring finger
+    (0.03, 0.005), (0.03, -0.02), (0.03, -0.04), (0.03, -0.06),  # pinky
+], dtype=np.float32)
+
+
+def synthetic_hands(count, seed=0):
+    """Landmarks of shape (count, 21, 3) for one hand circling the frame at 30 FPS and pinching about once a second."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(count) / FPS
+    landmarks = np.zeros((count, 21, 3), dtype=np.float32)
+    landmarks[..., :2] = _HAND
+    landmarks[:, 4, :2] = np.where((np.sin(2 * np.pi * t) > 0.6)[:, None], _HAND[8] + (0.005, 0.0), _HAND[4])
+    landmarks[..., 0] += (0.5 + 0.2 * np.cos(t))[:, None]
+    landmarks[..., 1] += (0.5 + 0.2 * np.sin(t))[:, None]
+    landmarks[..., :2] += rng.normal(0, 0.001, (count, 21, 2))
+    return landmarks
+
+
+def write_fixture(path, count, seed=0, hands=True):
+    """Records ``count`` frames of synthetic_hands, or without any hand, to ``path`` for ReplayLandmarker."""
+    handedness = np.ones(1 if hands else 0, dtype=np.int8)
+    no_hands = np.empty((0, 21, 3), dtype=np.float32)
+    with recording.LandmarkRecorder(path) as recorder:
+        for index, landmarks in enumerate(synthetic_hands(count, seed)):
+            recorder.write(LandmarkResult(index, index / FPS, None, landmarks[None] if hands else no_hands,
+                                          handedness, 0.0))
+
+
+class CallbackLandmarker(recording.ReplayLandmarker):
+    """Hands out recorded results the way Landmarker does in live stream mode: from another thread,
+    ``latency`` seconds after the frame was submitted, with at most one frame in flight."""
+
+    def __init__(self, recording, latency=0.015) -> None:
+        super().__init__(recording)
+        self.latency = latency
+        self.skipped = 0
+        self._submitted = None
+        self._running = True
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._deliver, daemon=True)
+        self._thread.start()
+
+    def detect_async(self, frame, frame_id=None, timestamp=None):
+        with self._condition:
+            if self._submitted is not None:
+                self.skipped += 1
+                return False
+            if self.finished:
+                return False
+            result = self.recording.result(self.index, frame)
+            if frame_id is not None:
+                result = result._replace(frame_id=frame_id)
+            self.index += 1
+            self._submitted = (result, time.monotonic() + self.latency)
+            self.in_flight = 1
+            self._condition.notify_all()
+        return True
+
+    def _deliver(self):
+        with self._condition:
+            while self._running:
+                if self._submitted is None:
+                    self._condition.wait()
+                    continue
+                result, due = self._submitted
+                if time.monotonic() < due:
+                    self._condition.wait(due - time.monotonic())
+                    continue
+                self._submitted = None
+                self.in_flight = 0
+                self._latest = result._replace(latency=self.latency)
+                self._condition.notify_all()
+
+    def poll(self):
+        with self._condition:
+            latest, self._latest = self._latest, None
+        return latest
+
+    def wait_result(self, timeout=None):
+        with self._condition:
+            self._condition.wait_for(lambda: self._latest is not None or self._submitted is None, timeout)
+            latest, self._latest = self._latest, None
+        return latest
+
+    @property
+    def stats(self):
+        return dict(super().stats, skipped=self.skipped, mean_latency=self.latency)
+
+    def close(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._thread.join()
+
+
+def measure(function, duration=0.5):
+    """Calls ``function`` repeatedly for about ``duration`` seconds and returns per call timings in microseconds."""
+    # batches of at least a millisecond keep the timer overhead out of the numbers
+    batch = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(batch):
+            function()
+        if time.perf_counter() - start >= 0.001 or batch >= 1 << 20:
+            break
+        batch *= 2
+
+    samples = []
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end or len(samples) < 5:
+        start = time.perf_counter()
+        for _ in range(batch):
+            function()
+        samples.append((time.perf_counter() - start) / batch * 1e6)
+    samples = np.array(samples)
+    p50, p95 = np.percentile(samples, (50, 95))
+    return {"mean_us": samples.mean(), "p50_us": p50, "p95_us": p95, "calls": len(samples) * batch}
+
+
+def bench_map_coordinate(options):
+    from .tracker import map_coordinate
+
+    return measure(lambda: map_coordinate(0.37), options.duration)
+
+
+def bench_filters(options):
+    results = {}
+    for name in sorted(filters.FILTERS):
+        pointer_filter = filters.create_filter(name)
+        state = {"t": 0.0}
+
+        def update():
+            state["t"] += 1 / FPS
+            pointer_filter.update(960 + 300 * np.cos(state["t"]), 540 + 300 * np.sin(state["t"]), state["t"])
+
+        results[f"filter_{name}"] = measure(update, options.duration)
+    return results
+
+
+def bench_draw(options):
+    from .tracker import draw_landmarks_on_image
+
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    landmarks = synthetic_hands(1)
+    return measure(lambda: draw_landmarks_on_image(frame, landmarks), options.duration)
+
+
+def bench_convert(options):
+    try:
+        from PyQt5.QtWidgets import QApplication
+    except ImportError:
+        return None
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from .app import App
+
+    application = QApplication.instance() or QApplication([])
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    result = measure(lambda: App.convert_cv_qt(frame), options.duration)
+    del application
+    return result
+
+
+def bench_mouse_interpolator(options):
+    """Cost of one cursor update through the mock backend, with the interpolator asked for far more
+    updates per second than any display needs."""
+    perf = metrics.Metrics(enabled=True, window=4096)
+    interpolator = MouseInterpolator(injection.MockInjector(), rate=10000.0, metrics=perf)
+    start = time.perf_counter()
+    end = start + options.duration * 2
+    t = 0.0
+    while time.perf_counter() < end:
+        t += 1 / FPS
+        interpolator.move_to(960 + 500 * np.cos(t), 540 + 500 * np.sin(t))
+        time.sleep(1 / FPS)
+    elapsed = time.perf_counter() - start
+    interpolator.stop()
+    samples = perf.timings["cursor_move"].latest()[:, 0] * 1000
+    p50, p95 = np.percentile(samples, (50, 95))
+    return {"mean_us": samples.mean(), "p50_us": p50, "p95_us": p95, "calls": interpolator.updates,
+            "updates_per_second": interpolator.updates / elapsed}
+
+
+def _bench_tracker(options, preview):
+    from .sources import SyntheticSource
+    from .tracker import Tracker
+
+    with tempfile.TemporaryDirectory() as path:
+        write_fixture(path, options.frames)
+        replay_landmarker = recording.ReplayLandmarker(recording.LandmarkRecording(path))
+        tracker = Tracker(SyntheticSource(frames=options.frames))
+        tracker.landmarker_factory = lambda: replay_landmarker
+        tracker.download_model = False
+        tracker.injector_name = "mock"
+        tracker.governor = None
+        tracker.screen_size = (1920, 1080)
+        tracker.click_distance = 0.6
+        tracker.began_processing = True
+        tracker.metrics.enabled = True
+        tracker.calibration_flag.set()
+        if preview:
+            tracker.on_frame = lambda frame: None
+
+        start = time.perf_counter()
+        tracker.run()
+        elapsed = time.perf_counter() - start
+        tracker.stop()
+
+    # only the whole run is timed, the stages have their own percentiles
+    frames = replay_landmarker.index
+    stages = tracker.metrics.snapshot()["stages"]
+    return {"mean_us": elapsed / max(frames, 1) * 1e6, "calls": frames,
+            "stages_ms": {stage: {"p50": stats["p50"], "p95": stats["p95"]} for stage, stats in stages.items()}}
+
+
+def bench_idle_cpu(options):
+    """CPU time the tracker uses while no hand is in view, with a 30 FPS source and detection throttled
+    as usual. Results come back from another thread after 15 ms like they do from MediaPipe, but without
+    running the model, so what's left is the cost of the control flow."""
+    from .sources import SyntheticSource
+    from .tracker import Tracker
+
+    with tempfile.TemporaryDirectory() as path:
+        write_fixture(path, int(options.idle_seconds * FPS) + 60, hands=False)
+        replay_landmarker = CallbackLandmarker(recording.LandmarkRecording(path))
+        tracker = Tracker(SyntheticSource(fps=FPS))
+        tracker.landmarker_factory = lambda: replay_landmarker
+        tracker.download_model = False
+        tracker.injector_name = "mock"
+        tracker.screen_size = (1920, 1080)
+        tracker.click_distance = 0.6
+        tracker.began_processing = True
+        tracker.calibration_flag.set()
+
+        thread = threading.Thread(target=tracker.run)
+        thread.start()
+        # let startup and the switch to the idle rate pass before measuring
+        time.sleep(3.0)
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        time.sleep(options.idle_seconds)
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+        tracker.stop()
+        thread.join()
+
+    frames = wall * FPS
+    return {"mean_us": cpu / frames * 1e6, "calls": int(frames), "cpu_percent": cpu / wall * 100}
+
+
+def bench_tracker(options):
+    return _bench_tracker(options, preview=False)
+
+
+def bench_tracker_preview(options):
+    return _bench_tracker(options, preview=True)
+
+
+# name -> function returning one result, a dict of named results or None when it can't run here.
+# Results without per call timings have no p50_us and p95_us.
+BENCHMARKS = {
+    "map_coordinate": bench_map_coordinate,
+    "filters": bench_filters,
+    "draw_landmarks": bench_draw,
+    "convert_cv_qt": bench_convert,
+    "mouse_interpolator": bench_mouse_interpolator,
+    "tracker_replay": bench_tracker,
+    "tracker_replay_preview": bench_tracker_preview,
+    "idle_cpu": bench_idle_cpu,
+}
+
+
+def run(options):
+    results = {}
+    for name, benchmark in BENCHMARKS.items():
+        if options.only and name not in options.only:
+            continue
+        result = benchmark(options)
+        if result is None:
+            print(f"{name:<28} skipped")
+            continue
+        for result_name, values in (result.items() if "mean_us" not in result else [(name, result)]):
+            results[result_name] = values
+            print(f"{result_name:<28} {values['mean_us']:>12.2f} us"
+                  + (f"  p95 {values['p95_us']:>12.2f} us" if "p95_us" in values else "")
+                  + (f"  {values['cpu_percent']:.1f}% CPU" if "cpu_percent" in values else ""))
+    return {
+        "version": RESULTS_VERSION,
+        "created": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(baseline, current, tolerance=0.2):
+    """Prints how much slower or faster every benchmark got, returns the names of the ones that regressed."""
+    regressions = []
+    for name, values in sorted(current["results"].items()):
+        if name not in baseline["results"]:
+            print(f"{name:<28} new")
+            continue
+        ratio = values["mean_us"] / baseline["results"][name]["mean_us"]
+        regressed = ratio > 1 + tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<28} {ratio:>6.2f}x {'REGRESSION' if regressed else ''}")
+    for name in sorted(set(baseline["results"]) - set(current["results"])):
+        print(f"{name:<28} missing")
+    return regressions
+
+
+def _load(path):
+    with open(path) as file:
+        results = json.load(file)
+    if results.get("version") != RESULTS_VERSION:
+        raise ValueError(f"{path} was written by an incompatible version of the benchmark")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="controllable-benchmark",
+                                     description="Benchmark the tracking pipeline on synthetic frames and landmarks.")
+    parser.add_argument("--output", metavar="PATH", help="write the results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against results written with --output")
+    parser.add_argument("--results", metavar="PATH",
+                        help="compare these results instead of running the benchmarks again")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="how much slower than the baseline counts as a regression (default: 0.2, i.e. 20%%)")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), metavar="NAME",
+                        help=f"only run these benchmarks: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--duration", type=float, default=0.5, help="seconds per micro benchmark (default: 0.5)")
+    parser.add_argument("--frames", type=int, default=600, help="frames per tracker run (default: 600)")
+    parser.add_argument("--idle-seconds", type=float, default=10.0,
+                        help="seconds the idle CPU usage is measured for (default: 10)")
+    options = parser.parse_args(argv)
+
+    current = _load(options.results) if options.results else run(options)
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(current, file, indent=2)
+    if options.compare:
+        print()
+        regressions = compare(_load(options.compare), current, options.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
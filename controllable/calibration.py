@@ -0,0 +1,130 @@
+import numpy as np
+
+from .filters import RingBuffer
+
+
+def otsu_split(samples):
+    """Splits 1-D samples into two classes maximizing the between-class variance.
+
+    Returns ``(threshold, separation)`` where ``separation`` is the share of the
+    total variance explained by the split (1 for two perfectly tight clusters,
+    around 0.6 or below for a single blob), or ``(None, 0.0)`` for fewer than two
+    distinct values.
+    """
+    samples = np.sort(np.asarray(samples, dtype=np.float64).ravel())
+    count = len(samples)
+    if count < 2 or samples[0] == samples[-1]:
+        return None, 0.0
+    # class 0 is samples[:k], class 1 samples[k:] for every possible k at once
+    k = np.arange(1, count)
+    sums = np.cumsum(samples)[:-1]
+    weight = k / count
+    mean_low = sums / k
+    mean_high = (samples.sum() - sums) / (count - k)
+    between = weight * (1 - weight) * (mean_high - mean_low) ** 2
+    # only split between different values
+    between[samples[1:] == samples[:-1]] = -1
+    best = int(np.argmax(between))
+    threshold = (samples[best] + samples[best + 1]) / 2
+    return threshold, between[best] / samples.var()
+
+
+class CalibrationEstimator:
+    """Estimates the click distance from labelled open and pinched samples.
+
+    The threshold is the Otsu split of all samples. It is ``confident`` once
+    both poses have ``min_samples``, the split explains at least
+    ``min_separation`` of the variance and at least ``agreement`` of the
+    samples of each pose land on their side of it, so a few bad frames
+    don't move it.
+    """
+
+    def __init__(self, min_samples=15, min_separation=0.8, agreement=0.9, window=256) -> None:
+        self.min_samples = min_samples
+        self.min_separation = min_separation
+        self.agreement = agreement
+        self.open = RingBuffer(window, dim=1)
+        self.pinched = RingBuffer(window, dim=1)
+
+    def add(self, distance, pinched):
+        (self.pinched if pinched else self.open).append(distance)
+
+    def split(self):
+        if not len(self.open) or not len(self.pinched):
+            return None, 0.0
+        return otsu_split(np.concatenate((self.open.latest(), self.pinched.latest())))
+
+    def confident(self):
+        if len(self.open) < self.min_samples or len(self.pinched) < self.min_samples:
+            return False
+        threshold, separation = self.split()
+        if threshold is None or separation < self.min_separation:
+            return False
+        return (np.mean(self.open.latest() > threshold) >= self.agreement
+                and np.mean(self.pinched.latest() <= threshold) >= self.agreement)
+
+    def result(self, fallback_open=1.0, fallback_pinched=0.4, bounds=(0.3, 1.5)):
+        """Returns ``(click_distance, pinched, open)``, the last two being the median distance of each pose.
+
+        Unless the estimate is ``confident`` the click distance is the midpoint
+        of the two medians, an Otsu split of samples that don't separate can
+        end up anywhere.
+        """
+        pinched = float(np.median(self.pinched.latest())) if len(self.pinched) else fallback_pinched
+        open_ = float(np.median(self.open.latest())) if len(self.open) else fallback_open
+        threshold = self.split()[0] if self.confident() else None
+        if threshold is None:
+            threshold = (pinched + open_) / 2
+        return float(min(max(threshold, bounds[0]), bounds[1])), pinched, open_
+
+
+class ThresholdAdapter:
+    """Follows slow drift of the click distance while in use.
+
+    While in use the hand is mostly relaxed rather than held in the "close but
+    not touching" pose of the calibration, so only the pinches are comparable
+    to it. Every pinch (a run of distances at or below the threshold) counts
+    with its smallest distance, which doesn't depend on the threshold the
+    way the frames of closing and opening fingers do. Keeps the last
+    ``window`` of them and after every ``interval`` pinches, once there are
+    at least ``min_class``, moves the threshold by ``rate`` towards their
+    median plus the margin between the calibrated threshold and the
+    calibrated ``pinched`` median. The threshold never leaves ``max_shift``
+    (relative) around the calibrated value or ``bounds``.
+    """
+
+    def __init__(self, click_distance, pinched, window=32, interval=4, rate=0.2, min_class=8, max_shift=0.3,
+                 bounds=(0.3, 1.5)) -> None:
+        self.calibrated = click_distance
+        self.click_distance = click_distance
+        self.margin = click_distance - pinched
+        self.interval = interval
+        self.rate = rate
+        self.min_class = min_class
+        self.low = max(bounds[0], click_distance * (1 - max_shift))
+        self.high = min(bounds[1], click_distance * (1 + max_shift))
+        self.pinches = RingBuffer(window, dim=1)
+        self.adaptations = 0
+        self._since_update = 0
+        # smallest distance of the pinch going on, None between pinches
+        self._pinch_min = None
+
+    def update(self, distance):
+        """Adds one pinch distance and returns the current click distance."""
+        if distance <= self.click_distance:
+            self._pinch_min = distance if self._pinch_min is None else min(self._pinch_min, distance)
+            return self.click_distance
+        if self._pinch_min is None:
+            return self.click_distance
+        self.pinches.append(self._pinch_min)
+        self._pinch_min = None
+        self._since_update += 1
+        if self._since_update < self.interval or len(self.pinches) < self.min_class:
+            return self.click_distance
+        self._since_update = 0
+
+        target = float(np.median(self.pinches.latest())) + self.margin
+        self.click_distance = float(min(max(self.click_distance + self.rate * (target - self.click_distance),
+                                            self.low), self.high))
+        self.adaptations += 1
+        return self.click_distance
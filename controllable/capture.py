@@ -0,0 +1,96 @@
+import threading
+import time
+
+import cv2
+
+
+class FrameGrabber:
+    """Reads frames on a dedicated thread and only keeps the newest one.
+
+    Frames that are replaced before the processing loop picks them up are
+    counted as dropped, so ``dropped`` shows how far behind the pipeline is.
+    With ``lossless`` set the capture thread instead waits for every frame to
+    be read, which is what replaying recorded footage needs. Frames of live
+    sources are timestamped with the time they were read, those of other
+    sources with their position in the recording (see FrameSource).
+    """
+
+    def __init__(self, cap, flip=True, lossless=False) -> None:
+        self.cap = cap
+        self.flip = flip
+        self.lossless = lossless
+        self.finished = False
+        self.frame = None
+        self.seq = 0
+        self.timestamp = 0.0
+        self.captured_at = 0.0
+        self.dropped = 0
+        self.failed_reads = 0
+        self._last_read_seq = 0
+        self._running = True
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._thread.start()
+
+    def _capture_loop(self):
+        retry_delay = 0.01
+        while self._running:
+            ret, frame = self.cap.read()
+            captured_at = time.monotonic()
+            if not ret:
+                if getattr(self.cap, "finished", False):
+                    with self._condition:
+                        self.finished = True
+                        self._running = False
+                        self._condition.notify_all()
+                    return
+                self.failed_reads += 1
+                # back off while the camera is gone or not ready yet, stop() still wakes us up
+                with self._condition:
+                    self._condition.wait_for(lambda: not self._running, retry_delay)
+                retry_delay = min(retry_delay * 2, 0.5)
+                continue
+            retry_delay = 0.01
+            if self.flip:
+                frame = cv2.flip(frame, 1)
+            timestamp = captured_at if self.cap.live else self.cap.timestamp
+
+            with self._condition:
+                if self.lossless:
+                    self._condition.wait_for(lambda: self.seq <= self._last_read_seq or not self._running)
+                if self.seq > self._last_read_seq:
+                    self.dropped += 1
+                self.frame = frame
+                self.timestamp = timestamp
+                self.captured_at = captured_at
+                self.seq += 1
+                self._condition.notify_all()
+
+    def read(self, timeout=1.0):
+        """Returns ``(seq, timestamp, frame, captured_at)`` for the newest unread frame or None on timeout.
+
+        ``captured_at`` is the ``time.monotonic()`` the frame was read at, for
+        live sources ``timestamp`` is the same.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.seq > self._last_read_seq or not self._running, timeout)
+            if self.seq <= self._last_read_seq:
+                return None
+            self._last_read_seq = self.seq
+            self._condition.notify_all()
+            return self.seq, self.timestamp, self.frame, self.captured_at
+
+    @property
+    def stats(self):
+        return {
+            "captured": self.seq,
+            "dropped": self.dropped,
+            "failed_reads": self.failed_reads,
+        }
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout=1.0)
@@ -0,0 +1,137 @@
+import argparse
+import functools
+
+from . import filters, hands, inference_worker, injection, landmarkers, metrics, publisher, recording, sources
+from .tracker import Tracker
+
+
+def resolution(value):
+    """Parses ``WIDTHxHEIGHT`` for argparse."""
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {value!r}")
+    return width, height
+
+
+def add_camera_arguments(parser):
+    parser.add_argument("--camera-format", metavar="FOURCC",
+                        help="pixel format to ask the camera for, e.g. MJPG (default: driver default)")
+    parser.add_argument("--resolution", type=resolution, metavar="WxH",
+                        help="capture resolution to ask the camera for, e.g. 1280x720 (default: driver default)")
+    parser.add_argument("--camera-fps", type=float, metavar="FPS",
+                        help="frame rate to ask the camera for (default: driver default)")
+    parser.add_argument("--buffer-size", type=int, default=1, metavar="FRAMES",
+                        help="frames the camera driver may buffer, more adds latency (default: 1)")
+
+
+def camera_settings(args):
+    return {
+        "fourcc": args.camera_format,
+        "resolution": args.resolution,
+        "camera_fps": args.camera_fps,
+        "buffer_size": args.buffer_size,
+    }
+
+
+def parse_args(argv=None, headless=False):
+    parser = argparse.ArgumentParser(
+        prog="controllable-headless" if headless else "controllable",
+        description="Control your computer using your hands." + (" Runs without a window." if headless else ""),
+    )
+    if not headless:
+        parser.add_argument("--only-hand", action="store_true", help="only show the hand landmarkers in the video feed")
+    parser.add_argument("--filter", choices=sorted(filters.FILTERS), default="one_euro",
+                        help="filter used to smooth the cursor movement (default: one_euro)")
+    parser.add_argument("--injector", choices=sorted(injection.INJECTORS), default="pynput",
+                        help="how mouse input is sent, 'mock' only records it (default: pynput)")
+    parser.add_argument("--user", default=None,
+                        help="name of the calibration profile to use, profiles are saved per camera and user")
+    parser.add_argument("--recalibrate", action="store_true",
+                        help="ignore the saved calibration profile and calibrate again")
+    parser.add_argument("--source", default="0",
+                        help="camera index, video file, image directory or 'synthetic[:WxH]' (default: 0)")
+    parser.add_argument("--fps", type=float, default=None,
+                        help="pace file and synthetic sources to this frame rate (default: as fast as possible)")
+    parser.add_argument("--loop", action="store_true", help="restart video files and image directories at the end")
+    add_camera_arguments(parser)
+    parser.add_argument("--refresh-rate", type=float, default=60.0, metavar="HZ",
+                        help="how often the cursor is moved, should match the display refresh rate (default: 60)")
+    parser.add_argument("--screen-size", type=resolution, metavar="WxH",
+                        help="size of the screen the cursor moves in (default: the first monitor, or 1920x1080 "
+                             "without one or with the mock injector)")
+    parser.add_argument("--no-adapt", action="store_true",
+                        help="keep the calibrated click distance instead of slowly following drift while in use")
+    parser.add_argument("--hands", type=int, default=1, metavar="N",
+                        help="number of hands the hand landmarker looks for, 1 is the fastest (default: 1)")
+    parser.add_argument("--controlling-hand", choices=hands.RULES, default="first",
+                        help="which hand controls the cursor when several are visible: the one that "
+                             "appeared first or only the left or right hand (default: first)")
+    parser.add_argument("--inference-width", type=int, default=None, metavar="PIXELS",
+                        help="downscale frames to this width before running the hand landmarker")
+    parser.add_argument("--roi", action="store_true",
+                        help="only run the hand landmarker on a crop around the last detected hand")
+    parser.add_argument("--inference-process", action="store_true",
+                        help="run the hand landmarker in a separate process so a busy UI doesn't delay tracking")
+    parser.add_argument("--full-rate", action="store_true",
+                        help="run the hand landmarker on every frame, even when the hand is still or gone")
+    if not headless:
+        parser.add_argument("--preview-fps", type=float, default=30.0, metavar="FPS",
+                            help="maximum frame rate of the video feed in the window (default: 30)")
+    parser.add_argument("--stats", action="store_true",
+                        help="print per-stage timings and rates" if headless else
+                        "show per-stage timings and rates below the video feed")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="periodically write metrics in Prometheus text format to this file")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="serve metrics in Prometheus text format at http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--publish", metavar="NAME",
+                        help="publish the annotated frames and landmarks to shared memory with this name")
+    parser.add_argument("--record", metavar="DIR", help="record the detected hand landmarks to this directory")
+    parser.add_argument("--replay", metavar="DIR",
+                        help="use landmarks recorded with --record instead of running the hand landmarker")
+    if headless:
+        return parser.parse_args(argv)
+    # unknown arguments are left for Qt
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def create_tracker(args, started_at=None):
+    """Builds a Tracker configured from the command line arguments, returns it and its MetricsExporter or None."""
+    source = sources.open_source(args.source, args.fps, args.loop, **camera_settings(args))
+    if source.live:
+        mode = source.mode
+        print(f"Camera mode: {mode['fourcc'] or '?'} {mode['width']}x{mode['height']} "
+              f"at {mode['fps']:g} FPS, buffer {mode['buffer_size']}")
+    tracker = Tracker(source)
+    if started_at is not None:
+        tracker.started_at = started_at
+    tracker.pointer_filter = filters.create_filter(args.filter)
+    tracker.refresh_rate = args.refresh_rate
+    tracker.adapt_threshold = not args.no_adapt
+    tracker.profile_user = args.user
+    tracker.injector_name = args.injector
+    tracker.screen_size = args.screen_size
+    tracker.landmarker_factory = functools.partial(
+        inference_worker.ProcessLandmarker if args.inference_process else landmarkers.Landmarker,
+        input_width=args.inference_width, roi=args.roi, num_hands=args.hands
+    )
+    tracker.hand_selector = hands.HandSelector(args.controlling_hand)
+    # recorded results and footage are replayed completely, the governor would
+    # skip most of the frames whenever they come faster than in real time
+    if args.full_rate or args.replay or not source.live:
+        tracker.governor = None
+    if args.publish:
+        tracker.publisher = publisher.FramePublisher(args.publish, max_hands=max(args.hands, 2))
+    if args.record:
+        tracker.recorder = recording.LandmarkRecorder(args.record, max_hands=max(args.hands, 2))
+    if args.replay:
+        replay_landmarker = recording.ReplayLandmarker(recording.LandmarkRecording(args.replay))
+        tracker.landmarker_factory = lambda: replay_landmarker
+        tracker.download_model = False
+    exporter = None
+    if args.metrics_file or args.metrics_port is not None:
+        tracker.metrics.enabled = True
+        exporter = metrics.MetricsExporter(tracker.metrics, args.metrics_file, args.metrics_port)
+    return tracker, exporter
@@ -0,0 +1,57 @@
+import cv2
+import numpy as np
+
+
+# MediaPipe's HAND_CONNECTIONS expressed as polylines
+HAND_CHAINS = (
+    (0, 1, 2, 3, 4),  # thumb
+    (0, 5, 6, 7, 8),  # index finger
+    (9, 10, 11, 12),  # middle finger
+    (13, 14, 15, 16),  # ring finger
+    (0, 17, 18, 19, 20),  # pinky
+    (5, 9, 13, 17),  # palm
+)
+_CHAIN_INDICES = [np.array(chain) for chain in HAND_CHAINS]
+
+CONNECTION_COLOR = (224, 224, 224)
+LANDMARK_COLOR = (48, 48, 255)
+
+
+def landmarks_to_pixels(landmarks, width, height):
+    """Converts normalized landmarks of shape (..., 21, 3) into int32 pixel coordinates of shape (..., 21, 2)."""
+    return (np.asarray(landmarks)[..., :2] * (width, height)).astype(np.int32)
+
+
+def draw_hand(image, points, connection_color=CONNECTION_COLOR, landmark_color=LANDMARK_COLOR):
+    """Draws one hand given as a (21, 2) int32 pixel array onto the image in place."""
+    cv2.polylines(image, [points[chain] for chain in _CHAIN_INDICES], False, connection_color, 2, cv2.LINE_AA)
+    for x, y in points.tolist():
+        cv2.circle(image, (x, y), 4, landmark_color, -1, cv2.LINE_AA)
+
+
+def draw_hands(image, points):
+    """Draws every hand of a (N, 21, 2) int32 pixel array onto the image in place."""
+    for hand_points in points:
+        draw_hand(image, hand_points)
+    return image
+
+
+class BlankCanvas:
+    """Hands out black frames from a small pool of reused buffers.
+
+    Several buffers are rotated so a frame that is still being shown by the
+    UI isn't cleared while it's being converted.
+    """
+
+    def __init__(self, buffers=3) -> None:
+        self.buffers = buffers
+        self._pool = []
+        self._index = 0
+
+    def get(self, shape):
+        if not self._pool or self._pool[0].shape != tuple(shape):
+            self._pool = [np.zeros(shape, dtype=np.uint8) for _ in range(self.buffers)]
+        canvas = self._pool[self._index]
+        self._index = (self._index + 1) % self.buffers
+        canvas.fill(0)
+        return canvas
@@ -0,0 +1,186 @@
+import argparse
+import collections
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+
+import cv2
+
+from . import landmarkers, recording
+
+
+# a part of one video, frames [start, stop) or until the end of the file if stop is None
+Chunk = collections.namedtuple("Chunk", ["video", "path", "index", "start", "stop", "fps"])
+
+
+def plan_chunks(paths, chunk_frames=1800):
+    """Splits every video into chunks of ``chunk_frames`` frames.
+
+    Videos that don't report their frame count become a single chunk.
+    Raises RuntimeError for a file that can't be opened.
+    """
+    chunks = []
+    for video, path in enumerate(paths):
+        cap = cv2.VideoCapture(path)
+        try:
+            if not cap.isOpened():
+                raise RuntimeError(f"Couldn't open {path}")
+            frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        finally:
+            cap.release()
+        if frames <= 0:
+            chunks.append(Chunk(video, path, 0, 0, None, fps))
+            continue
+        for index, start in enumerate(range(0, frames, chunk_frames)):
+            chunks.append(Chunk(video, path, index, start, min(start + chunk_frames, frames), fps))
+    return chunks
+
+
+def _chunk_path(output, chunk):
+    return os.path.join(output, f"chunk-{chunk.index:05d}")
+
+
+def extract_chunk(chunk, output, landmarker_options, mirror=True):
+    """Runs the landmarker over one chunk and records every frame to its own directory below ``output``.
+
+    Every chunk gets a fresh Landmarker, so hands are searched for from
+    scratch at the start of a chunk. With ``mirror`` the frames are flipped
+    like the tracker flips the camera image, so the recording matches what
+    ``--record`` writes. Returns ``(pid, frames, seconds)``.
+    """
+    landmarker = landmarkers.Landmarker(**landmarker_options)
+    cap = cv2.VideoCapture(chunk.path)
+    start = time.perf_counter()
+    frame_id = chunk.start
+    try:
+        if chunk.start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, chunk.start)
+        with recording.LandmarkRecorder(_chunk_path(output, chunk),
+                                        max_hands=landmarker_options.get("num_hands", 1)) as recorder:
+            while chunk.stop is None or frame_id < chunk.stop:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if mirror:
+                    frame = cv2.flip(frame, 1)
+                result = landmarker.detect(frame, frame_id, frame_id / chunk.fps)
+                recorder.write(result._replace(frame=None))
+                frame_id += 1
+    finally:
+        cap.release()
+        landmarker.close()
+    return os.getpid(), frame_id - chunk.start, time.perf_counter() - start
+
+
+def _extract_chunk(task):
+    chunk, output, landmarker_options, mirror = task
+    return chunk, extract_chunk(chunk, output, landmarker_options, mirror)
+
+
+def merge_chunks(output, chunks):
+    """Appends the chunk recordings below ``output`` into one recording there and removes them."""
+    chunks = sorted(chunks, key=lambda chunk: chunk.index)
+    with open(os.path.join(_chunk_path(output, chunks[0]), "meta.json")) as file:
+        meta = file.read()
+    with open(os.path.join(output, "meta.json"), "w") as file:
+        file.write(meta)
+    # the columns are raw rows of a fixed size, so the files can simply be concatenated
+    for column in recording.COLUMNS:
+        with open(os.path.join(output, f"{column}.bin"), "wb") as merged:
+            for chunk in chunks:
+                with open(os.path.join(_chunk_path(output, chunk), f"{column}.bin"), "rb") as file:
+                    shutil.copyfileobj(file, merged)
+    for chunk in chunks:
+        shutil.rmtree(_chunk_path(output, chunk))
+
+
+def _output_paths(paths, output):
+    """One output directory per video, named after the file and numbered if names collide."""
+    names = []
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        unique, number = name, 1
+        while unique in names:
+            number += 1
+            unique = f"{name}-{number}"
+        names.append(unique)
+    return [os.path.join(output, name) for name in names]
+
+
+def extract(paths, output, workers=None, chunk_frames=1800, mirror=True, **landmarker_options):
+    """Extracts the landmarks of every video in ``paths`` into one recording per video below ``output``.
+
+    The chunks of all videos are spread over a pool of ``workers`` processes
+    (one per core by default). Every worker streams its results straight to
+    disk, so memory use doesn't grow with the length of the videos. Returns
+    the frames and busy seconds of every worker process, by pid.
+    """
+    chunks = plan_chunks(paths, chunk_frames)
+    outputs = _output_paths(paths, output)
+    remaining = collections.Counter(chunk.video for chunk in chunks)
+    done = collections.defaultdict(list)
+    workers_stats = collections.defaultdict(lambda: [0, 0.0])
+    landmarker_options.setdefault("running_mode", "video")
+
+    # the model is downloaded once here instead of by every worker at the same time
+    landmarkers.ensure_model()
+    context = multiprocessing.get_context("spawn")
+    tasks = [(chunk, outputs[chunk.video], landmarker_options, mirror) for chunk in chunks]
+    with context.Pool(workers or os.cpu_count()) as pool:
+        for finished, (chunk, (pid, frames, seconds)) in enumerate(pool.imap_unordered(_extract_chunk, tasks), 1):
+            stats = workers_stats[pid]
+            stats[0] += frames
+            stats[1] += seconds
+            print(f"[{finished}/{len(chunks)}] {os.path.basename(chunk.path)} frames {chunk.start}-"
+                  f"{chunk.start + frames}: {frames / seconds if seconds else 0.0:.1f} frames/s (worker {pid})")
+
+            done[chunk.video].append(chunk)
+            remaining[chunk.video] -= 1
+            if not remaining[chunk.video]:
+                merge_chunks(outputs[chunk.video], done.pop(chunk.video))
+                print(f"Wrote {outputs[chunk.video]}")
+    return dict(workers_stats)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="controllable-extract",
+                                     description="Extract hand landmarks from recorded videos in parallel.")
+    parser.add_argument("videos", nargs="+", metavar="VIDEO", help="video files to process")
+    parser.add_argument("--output", metavar="DIR", required=True,
+                        help="directory to write one landmark recording per video to")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--chunk-frames", type=int, default=1800,
+                        help="frames per chunk a worker processes at once (default: 1800)")
+    parser.add_argument("--mode", choices=("video", "image"), default="video",
+                        help="video tracks hands from frame to frame, image detects them in every frame "
+                             "independently (slower) (default: video)")
+    parser.add_argument("--hands", type=int, default=2, help="maximum number of hands per frame (default: 2)")
+    parser.add_argument("--inference-width", type=int, metavar="PIXELS",
+                        help="downscale frames to this width before inference")
+    parser.add_argument("--no-mirror", action="store_true",
+                        help="don't flip the frames horizontally like the tracker does with the camera image")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        workers_stats = extract(args.videos, args.output, args.workers, args.chunk_frames, not args.no_mirror,
+                                running_mode=args.mode, num_hands=args.hands, input_width=args.inference_width)
+    except RuntimeError as error:
+        print(error)
+        return 1
+    elapsed = time.perf_counter() - start
+
+    total = 0
+    print()
+    for pid, (frames, seconds) in sorted(workers_stats.items()):
+        total += frames
+        print(f"worker {pid:>7}: {frames:>8} frames  {frames / seconds if seconds else 0.0:>7.1f} frames/s")
+    print(f"total: {total} frames in {elapsed:.1f} s, {total / elapsed:.1f} frames/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
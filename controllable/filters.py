@@ -0,0 +1,187 @@
+import math
+
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-capacity buffer of the most recent samples, backed by a numpy array."""
+
+    def __init__(self, capacity, dim=2, dtype=np.float64) -> None:
+        self.capacity = capacity
+        self.data = np.zeros((capacity, dim), dtype=dtype)
+        self.index = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, sample):
+        self.data[self.index] = sample
+        self.index = (self.index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def latest(self, n=None):
+        """Returns up to ``n`` of the newest samples in chronological order."""
+        n = self.count if n is None else min(n, self.count)
+        idx = (self.index - n + np.arange(n)) % self.capacity
+        return self.data[idx]
+
+    def clear(self):
+        self.index = 0
+        self.count = 0
+
+
+class PointerFilter:
+    """Base class for filters smoothing the (x, y) pointer position.
+
+    ``update`` takes one sample and its timestamp in seconds and returns the
+    filtered position. Every filter keeps a constant amount of state.
+    """
+
+    def __init__(self) -> None:
+        self.last_t = None
+
+    def _dt(self, t):
+        dt = t - self.last_t if self.last_t is not None else 0.0
+        self.last_t = t
+        # fall back to a typical camera frame time for duplicate timestamps
+        return dt if dt > 0 else 1 / 30
+
+    def update(self, x, y, t):
+        point = self._filter(np.array((x, y), dtype=np.float64), t)
+        return float(point[0]), float(point[1])
+
+    def _filter(self, point, t):
+        raise NotImplementedError
+
+    def reset(self):
+        self.last_t = None
+
+
+class EMAFilter(PointerFilter):
+    """Exponential moving average, ``alpha`` is the weight of the newest sample (the lower, the smoother)."""
+
+    def __init__(self, alpha=0.3, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.alpha = alpha
+        self.state = None
+
+    def _filter(self, point, t):
+        self._dt(t)
+        if self.state is None:
+            self.state = point
+        else:
+            self.state = self.alpha * point + (1 - self.alpha) * self.state
+        return self.state
+
+    def reset(self):
+        super().reset()
+        self.state = None
+
+
+class OneEuroFilter(PointerFilter):
+    """One-Euro filter (Casiez et al. 2012).
+
+    ``min_cutoff`` (Hz) sets the smoothing at rest, ``beta`` how quickly the
+    cutoff rises with speed (in pixels per second), ``d_cutoff`` (Hz) the
+    smoothing of the speed estimate itself.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.005, d_cutoff=1.0, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.state = None
+        self.derivative = np.zeros(2)
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def _filter(self, point, t):
+        dt = self._dt(t)
+        if self.state is None:
+            self.state = point
+            return self.state
+
+        derivative = (point - self.state) / dt
+        a_d = self._alpha(self.d_cutoff, dt)
+        self.derivative = a_d * derivative + (1 - a_d) * self.derivative
+
+        cutoff = self.min_cutoff + self.beta * np.abs(self.derivative)
+        a = self._alpha(cutoff, dt)
+        self.state = a * point + (1 - a) * self.state
+        return self.state
+
+    def reset(self):
+        super().reset()
+        self.state = None
+        self.derivative = np.zeros(2)
+
+
+class KalmanFilter(PointerFilter):
+    """Constant-velocity Kalman filter, run independently on both axes.
+
+    ``process_noise`` is the acceleration variance in px²/s⁴ and
+    ``measurement_noise`` the variance of a measured position in px².
+    """
+
+    def __init__(self, process_noise=5e5, measurement_noise=50.0, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.position = None
+        self.velocity = np.zeros(2)
+        # covariance entries per axis: var(pos), cov(pos, vel), var(vel)
+        self.p00 = np.zeros(2)
+        self.p01 = np.zeros(2)
+        self.p11 = np.zeros(2)
+
+    def _filter(self, point, t):
+        dt = self._dt(t)
+        if self.position is None:
+            self.position = point
+            self.velocity = np.zeros(2)
+            self.p00[:] = self.measurement_noise
+            self.p01[:] = 0.0
+            self.p11[:] = self.process_noise
+            return self.position
+
+        q = self.process_noise
+        # predict
+        self.position = self.position + self.velocity * dt
+        self.p00 = self.p00 + dt * (2 * self.p01 + dt * self.p11) + q * dt ** 4 / 4
+        self.p01 = self.p01 + dt * self.p11 + q * dt ** 3 / 2
+        self.p11 = self.p11 + q * dt ** 2
+
+        # correct
+        s = self.p00 + self.measurement_noise
+        k0 = self.p00 / s
+        k1 = self.p01 / s
+        residual = point - self.position
+        self.position = self.position + k0 * residual
+        self.velocity = self.velocity + k1 * residual
+        self.p11 = self.p11 - k1 * self.p01
+        self.p00 = (1 - k0) * self.p00
+        self.p01 = (1 - k0) * self.p01
+        return self.position
+
+    def reset(self):
+        super().reset()
+        self.position = None
+        self.velocity = np.zeros(2)
+
+
+FILTERS = {
+    "ema": EMAFilter,
+    "one_euro": OneEuroFilter,
+    "kalman": KalmanFilter,
+}
+
+
+def create_filter(name="one_euro", **params):
+    if name not in FILTERS:
+        raise ValueError(f"Unknown filter {name!r}, choose one of {', '.join(FILTERS)}")
+    return FILTERS[name](**params)
@@ -0,0 +1,169 @@
+import collections
+
+import numpy as np
+
+
+CLICK = "click"
+PRESS = "press"
+RELEASE = "release"
+
+# ``index`` is the frame (or step) the event was emitted on
+GestureEvent = collections.namedtuple("GestureEvent", ["kind", "timestamp", "index"])
+
+THUMB_TIP = 4
+INDEX_FINGER_MCP = 5
+INDEX_FINGER_TIP = 8
+PINKY_MCP = 17
+
+
+def _distance(landmarks, a, b):
+    delta = landmarks[..., a, :2] - landmarks[..., b, :2]
+    return np.hypot(delta[..., 0], delta[..., 1])
+
+
+def palm_width(landmarks):
+    """Distance between the index finger and pinky knuckles, used as the hand's scale."""
+    return _distance(np.asarray(landmarks), INDEX_FINGER_MCP, PINKY_MCP)
+
+
+def pinch_distance(landmarks, normalize=False):
+    """Distance between thumb tip and index finger tip for landmarks of shape (..., 21, 3), NaN for missing hands.
+
+    With ``normalize`` it's measured in palm widths, which stays the same when
+    the hand moves closer to or further from the camera.
+    """
+    landmarks = np.asarray(landmarks)
+    distance = _distance(landmarks, THUMB_TIP, INDEX_FINGER_TIP)
+    if normalize:
+        distance = distance / np.maximum(palm_width(landmarks), 1e-6)
+    return distance
+
+
+class GestureEngine:
+    """Turns pinch distances over time into click, press and release events.
+
+    Without dragging a pinch clicks right away and repeats every
+    ``click_cooldown`` seconds while held, a release within ``release_grace``
+    still counts as touching. With dragging a pinch shorter than
+    ``drag_delay`` clicks when it's released and a longer one presses the
+    button until it's released. A hand that is missing for up to
+    ``lost_timeout`` seconds keeps its last state. With ``normalize`` the
+    ``click_distance`` is measured in palm widths instead of image units.
+
+    ``step`` processes one frame at a time, ``evaluate`` a whole recording at
+    once and emits the same events.
+    """
+
+    def __init__(self, click_distance, enable_dragging=False, drag_delay=0.2, click_cooldown=0.5,
+                 release_grace=0.1, lost_timeout=0.3, normalize=False) -> None:
+        self.click_distance = click_distance
+        self.normalize = normalize
+        self.enable_dragging = enable_dragging
+        self.drag_delay = drag_delay
+        self.click_cooldown = click_cooldown
+        self.release_grace = release_grace
+        self.lost_timeout = lost_timeout
+        self.reset()
+
+    def reset(self):
+        self.index = 0
+        self.distance = float("nan")
+        self.raw_touching = False
+        self.touching = False
+        self.dragging = False
+        self.touch_start = None
+        self.last_touch = -np.inf
+        self.last_click = -np.inf
+        self.last_seen = -np.inf
+
+    def step(self, timestamp, landmarks=None):
+        """Processes one frame with (21, 3) landmarks or None when no hand was found and returns its events."""
+        t = timestamp
+        index = self.index
+        self.index += 1
+        events = []
+
+        if self.dragging and not self.enable_dragging:
+            self.dragging = False
+            events.append(GestureEvent(RELEASE, t, index))
+
+        if landmarks is not None:
+            self.distance = float(pinch_distance(landmarks, self.normalize))
+            self.raw_touching = self.distance <= self.click_distance
+            self.last_seen = t
+        elif t > self.last_seen + self.lost_timeout:
+            self.raw_touching = False
+
+        if self.raw_touching:
+            if self.touch_start is None:
+                self.touch_start = t
+            self.last_touch = t
+            if self.enable_dragging and not self.dragging and t >= self.touch_start + self.drag_delay:
+                self.dragging = True
+                events.append(GestureEvent(PRESS, t, index))
+        elif self.touch_start is not None:
+            if self.dragging:
+                self.dragging = False
+                events.append(GestureEvent(RELEASE, t, index))
+            elif self.enable_dragging and t < self.touch_start + self.drag_delay and t > self.last_click + self.click_cooldown:
+                self.last_click = t
+                events.append(GestureEvent(CLICK, t, index))
+            self.touch_start = None
+
+        self.touching = self.raw_touching or t < self.last_touch + self.release_grace
+        if not self.enable_dragging and self.touching and t > self.last_click + self.click_cooldown:
+            self.last_click = t
+            events.append(GestureEvent(CLICK, t, index))
+        return events
+
+    def evaluate(self, timestamps, landmarks):
+        """Evaluates a whole recording from its initial state.
+
+        ``landmarks`` has shape (T, 21, 3) with NaN rows for frames without a
+        hand. Returns the events sorted by frame, doesn't touch the streaming state.
+        """
+        t = np.asarray(timestamps, dtype=np.float64)
+        count = len(t)
+        frames = np.arange(count)
+        distance = pinch_distance(landmarks, self.normalize)
+        valid = ~np.isnan(distance)
+        with np.errstate(invalid="ignore"):
+            raw_valid = distance <= self.click_distance
+
+        # frames without a hand keep the state of the last hand for lost_timeout seconds
+        last_valid = np.maximum.accumulate(np.where(valid, frames, -1))
+        seen = last_valid >= 0
+        carried = seen & raw_valid[np.maximum(last_valid, 0)] & ~(t > t[np.maximum(last_valid, 0)] + self.lost_timeout)
+        raw = np.where(valid, raw_valid, carried)
+
+        edges = np.diff(np.concatenate(([0], raw.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+
+        events = []
+        if self.enable_dragging:
+            last_click = -np.inf
+            press_at = np.searchsorted(t, t[starts] + self.drag_delay, side="left")
+            for start, end, press in zip(starts, ends, press_at):
+                if press < end:
+                    events.append(GestureEvent(PRESS, t[press], press))
+                    if end < count:
+                        events.append(GestureEvent(RELEASE, t[end], end))
+                elif end < count and t[end] < t[start] + self.drag_delay and t[end] > last_click + self.click_cooldown:
+                    last_click = t[end]
+                    events.append(GestureEvent(CLICK, t[end], end))
+        else:
+            last_touch = np.maximum.accumulate(np.where(raw, frames, -1))
+            last_touch_time = np.where(last_touch >= 0, t[np.maximum(last_touch, 0)], -np.inf)
+            touching = raw | (t < last_touch_time + self.release_grace)
+            candidates = np.flatnonzero(touching)
+            candidate_times = t[candidates]
+            # only the clicks themselves are walked, everything else is array work
+            position = 0
+            while position < len(candidates):
+                index = candidates[position]
+                events.append(GestureEvent(CLICK, t[index], index))
+                position = np.searchsorted(candidate_times, t[index] + self.click_cooldown, side="right")
+
+        events.sort(key=lambda event: event.index)
+        return [GestureEvent(event.kind, float(event.timestamp), int(event.index)) for event in events]
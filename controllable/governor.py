@@ -0,0 +1,71 @@
+import numpy as np
+
+from .gestures import INDEX_FINGER_TIP, THUMB_TIP
+
+
+ACTIVE = "active"
+STILL = "still"
+IDLE = "idle"
+
+
+class RateGovernor:
+    """Decides how often hand detection runs.
+
+    While the hand moves detection runs at ``active_fps`` (None means every
+    frame). Once the index finger and thumb tips haven't moved more than
+    ``still_threshold`` (normalized) for ``still_after`` seconds it drops to
+    ``still_fps``, and when no hand was seen for ``idle_after`` seconds to
+    ``idle_fps``. Any motion or a newly found hand switches back to active
+    right away.
+    """
+
+    def __init__(self, active_fps=None, still_fps=15.0, idle_fps=4.0, still_after=1.0, idle_after=2.0,
+                 still_threshold=0.01) -> None:
+        self.rates = {ACTIVE: active_fps, STILL: still_fps, IDLE: idle_fps}
+        self.still_after = still_after
+        self.idle_after = idle_after
+        self.still_threshold = still_threshold
+        self.state = ACTIVE
+        self.transitions = 0
+        self.last_inference = -np.inf
+        self.last_hand = -np.inf
+        self.last_motion = -np.inf
+        self._reference = None
+
+    @property
+    def target_fps(self):
+        return self.rates[self.state]
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            self.transitions += 1
+
+    def should_infer(self, timestamp):
+        """Returns whether the frame captured at ``timestamp`` should be sent to the landmarker."""
+        fps = self.target_fps
+        if fps and timestamp < self.last_inference + 1 / fps:
+            return False
+        self.last_inference = timestamp
+        return True
+
+    def update(self, timestamp, landmarks=None):
+        """Feeds the (21, 3) landmarks of a finished detection, or None when no hand was found."""
+        if landmarks is None:
+            self._reference = None
+            if timestamp > self.last_hand + self.idle_after:
+                self._set_state(IDLE)
+            return
+
+        self.last_hand = timestamp
+        tips = landmarks[[THUMB_TIP, INDEX_FINGER_TIP], :2]
+        if self._reference is None or np.abs(tips - self._reference).max() > self.still_threshold:
+            self._reference = tips
+            self.last_motion = timestamp
+            self._set_state(ACTIVE)
+        elif timestamp > self.last_motion + self.still_after:
+            self._set_state(STILL)
+
+    @property
+    def stats(self):
+        return {"state": self.state, "target_fps": self.target_fps, "transitions": self.transitions}
@@ -0,0 +1,93 @@
+import numpy as np
+
+from .landmarkers import HANDEDNESS
+
+
+WRIST = 0
+MIDDLE_FINGER_MCP = 9
+
+# rules for picking the hand that controls the cursor
+RULES = ("first", "left", "right")
+
+
+def hand_centers(landmarks):
+    """Center of the palm (between wrist and middle finger knuckle) for (N, 21, 3) landmarks, shape (N, 2)."""
+    landmarks = np.asarray(landmarks)
+    return (landmarks[:, WRIST, :2] + landmarks[:, MIDDLE_FINGER_MCP, :2]) / 2
+
+
+class HandSelector:
+    """Gives detected hands stable ids and picks the one that controls the cursor.
+
+    MediaPipe doesn't keep the order of hands between frames, so every hand
+    is matched to the nearest hand of the previous frames (at most
+    ``max_distance`` apart in normalized coordinates) and keeps its id. Hands
+    that are missing for longer than ``lost_timeout`` seconds are forgotten.
+    With the ``first`` rule the hand that has been in view the longest
+    controls the cursor until it's gone, ``left`` and ``right`` only accept a
+    hand with that handedness.
+    """
+
+    def __init__(self, rule="first", max_distance=0.2, lost_timeout=0.3) -> None:
+        if rule not in RULES:
+            raise ValueError(f"Unknown rule {rule!r}, choose one of {', '.join(RULES)}")
+        self.rule = rule
+        self.max_distance = max_distance
+        self.lost_timeout = lost_timeout
+        self.reset()
+
+    def reset(self):
+        self.next_id = 0
+        # id -> [center, last_seen, first_seen, handedness]
+        self.tracks = {}
+        self.controlling_id = None
+
+    def _match(self, timestamp, centers, handedness):
+        """Returns the track id of every hand, creating tracks for new hands."""
+        track_ids = list(self.tracks)
+        ids = [None] * len(centers)
+        if track_ids and len(centers):
+            previous = np.array([self.tracks[track_id][0] for track_id in track_ids])
+            distances = np.linalg.norm(centers[:, None, :] - previous[None, :, :], axis=2)
+            # greedy is optimal enough for the two or so hands MediaPipe returns
+            for flat in np.argsort(distances, axis=None):
+                hand, track = np.unravel_index(flat, distances.shape)
+                if distances[hand, track] > self.max_distance:
+                    break
+                if ids[hand] is None and track_ids[track] not in ids:
+                    ids[hand] = track_ids[track]
+
+        for hand, center in enumerate(centers):
+            if ids[hand] is None:
+                ids[hand] = self.next_id
+                self.tracks[self.next_id] = [center, timestamp, timestamp, handedness[hand]]
+                self.next_id += 1
+            else:
+                track = self.tracks[ids[hand]]
+                track[0] = center
+                track[1] = timestamp
+                track[3] = handedness[hand]
+        return ids
+
+    def update(self, timestamp, landmarks, handedness):
+        """Matches the (N, 21, 3) landmarks of a frame to known hands and returns the index of the controlling hand, or None."""
+        for track_id in [track_id for track_id, track in self.tracks.items() if timestamp - track[1] > self.lost_timeout]:
+            del self.tracks[track_id]
+        if self.controlling_id not in self.tracks:
+            self.controlling_id = None
+
+        ids = self._match(timestamp, hand_centers(landmarks) if len(landmarks) else np.empty((0, 2)), handedness)
+
+        if self.controlling_id in ids:
+            return ids.index(self.controlling_id)
+        if self.controlling_id is not None:
+            # the controlling hand was missed in this frame, don't hand control over yet
+            return None
+
+        candidates = [hand for hand in range(len(ids))
+                      if self.rule == "first" or handedness[hand] == HANDEDNESS[self.rule.capitalize()]]
+        if not candidates:
+            return None
+        hand = min(candidates, key=lambda hand: self.tracks[ids[hand]][2])
+        self.controlling_id = ids[hand]
+        return hand
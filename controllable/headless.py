@@ -0,0 +1,59 @@
+import signal
+import sys
+import threading
+import time
+
+# startup times are measured from here, before the heavy imports
+STARTED_AT = time.perf_counter()
+
+from .cli import create_tracker, parse_args
+
+
+class _Printer:
+    """Prints the tracker's instructions, but only when they change."""
+
+    def __init__(self) -> None:
+        self.last = None
+
+    def __call__(self, text):
+        if text != self.last:
+            self.last = text
+            print(text)
+
+
+def _print_stats(tracker, stop, interval=5.0):
+    while not stop.wait(interval):
+        print(tracker.metrics.format_text(), end="\n\n")
+
+
+def main(argv=None):
+    """Calibrates (or loads the saved profile) and tracks without Qt and without drawing any preview."""
+    args = parse_args(argv, headless=True)
+    tracker, exporter = create_tracker(args, STARTED_AT)
+    tracker.on_text = _Printer()
+    tracker.began_processing = True
+
+    stop_stats = threading.Event()
+    if args.stats:
+        tracker.metrics.enabled = True
+        threading.Thread(target=_print_stats, args=(tracker, stop_stats), daemon=True).start()
+
+    if not args.recalibrate and tracker.load_profile():
+        print("Loaded your saved calibration, tracking starts as soon as the hand landmarker is ready.")
+    else:
+        tracker.calibrate()
+
+    # stop from another thread so run() can finish and release the mouse buttons
+    signal.signal(signal.SIGINT, lambda *_: threading.Thread(target=tracker.stop).start())
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=tracker.stop).start())
+    tracker.run()
+    stop_stats.set()
+    tracker.stop()
+    if exporter is not None:
+        exporter.stop()
+    if tracker.landmarker_error is not None:
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .landmarkers import Landmarker, LandmarkResult
+
+
+def _worker_main(tasks, results, landmarker_options):
+    landmarker = None
+    memory = None
+    try:
+        landmarker = Landmarker(running_mode="video", **landmarker_options)
+        landmarker.warm_up()
+        results.put("ready")
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            name, slot, offset, shape, dtype, frame_id, timestamp = task
+            if memory is None or memory.name != name:
+                if memory is not None:
+                    memory.close()
+                memory = shared_memory.SharedMemory(name=name)
+            frame = np.ndarray(shape, dtype=dtype, buffer=memory.buf, offset=offset)
+            result = landmarker.detect(frame, frame_id, timestamp)
+            del frame
+            results.put((slot, frame_id, timestamp, result.landmarks, result.handedness, result.latency))
+    except Exception:
+        # exceptions don't always pickle, the traceback is enough to report it
+        results.put(("error", traceback.format_exc()))
+    finally:
+        if landmarker is not None:
+            landmarker.close()
+        if memory is not None:
+            memory.close()
+        results.put(None)
+
+
+class ProcessLandmarker:
+    """Runs the Landmarker in a separate worker process.
+
+    Frames are copied into a ring of ``slots`` shared memory buffers instead
+    of being pickled, only the landmark arrays are sent back. It has the same
+    ``detect_async``/``poll`` interface as Landmarker, with one frame in
+    flight per slot. Other keyword arguments are passed on to the worker's
+    Landmarker. The worker warms its Landmarker up right after it starts,
+    ``warm_up`` waits for that. Once the worker has failed or died every
+    further call raises a RuntimeError.
+    """
+
+    def __init__(self, slots=2, **landmarker_options) -> None:
+        self.slots = slots
+        self.submitted = 0
+        self.skipped = 0
+        self.completed = 0
+        self.total_latency = 0.0
+        self._memory = None
+        self._slot_size = 0
+        self._free_slots = list(range(slots))
+        self._pending = {}
+        self._latest = None
+        self._lock = threading.Lock()
+        self._result_ready = threading.Condition(self._lock)
+        self._ready = threading.Event()
+        self._error = None
+        self._closing = False
+
+        context = multiprocessing.get_context("spawn")
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        self._process = context.Process(
+            target=_worker_main, args=(self._tasks, self._results, landmarker_options), daemon=True
+        )
+        self._process.start()
+        self._reader = threading.Thread(target=self._read_results, daemon=True)
+        self._reader.start()
+
+    def _read_results(self):
+        while True:
+            try:
+                message = self._results.get(timeout=0.5)
+            except queue.Empty:
+                # killed without a chance to say goodbye
+                if self._process.is_alive():
+                    continue
+                message = None
+            if message is None:
+                if not self._closing:
+                    self._fail("The inference worker exited unexpectedly")
+                break
+            if message == "ready":
+                self._ready.set()
+                continue
+            if message[0] == "error":
+                print(message[1], file=sys.stderr, end="")
+                self._fail(f"The inference worker failed: {message[1].strip().splitlines()[-1]}")
+                continue
+            slot, frame_id, timestamp, landmarks, handedness, _ = message
+            with self._lock:
+                self._free_slots.append(slot)
+                pending = self._pending.pop(slot, None)
+                if pending is None:
+                    continue
+                frame, submitted_at = pending
+                latency = time.monotonic() - submitted_at
+                self.completed += 1
+                self.total_latency += latency
+                self._latest = LandmarkResult(frame_id, timestamp, frame, landmarks, handedness, latency)
+                self._result_ready.notify_all()
+
+    def _fail(self, message):
+        with self._lock:
+            if self._error is None:
+                self._error = RuntimeError(message)
+            self._result_ready.notify_all()
+        self._ready.set()
+
+    def _check(self):
+        if self._error is not None:
+            raise self._error
+
+    def _ensure_memory(self, nbytes):
+        if self._memory is not None and nbytes <= self._slot_size:
+            return
+        # frames got bigger, the worker switches to the new block with the next task
+        if self._memory is not None and len(self._free_slots) < self.slots:
+            return
+        if self._memory is not None:
+            self._memory.close()
+            self._memory.unlink()
+        self._memory = shared_memory.SharedMemory(create=True, size=nbytes * self.slots)
+        self._slot_size = nbytes
+
+    @property
+    def in_flight(self):
+        return len(self._pending)
+
+    def detect_async(self, frame, frame_id=None, timestamp=None):
+        """Copies a frame into a free slot and hands it to the worker. Returns False if every slot is busy."""
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            self._check()
+            if not self._free_slots:
+                self.skipped += 1
+                return False
+            self._ensure_memory(frame.nbytes)
+            if frame.nbytes > self._slot_size:
+                # still waiting for frames in the old buffers to come back
+                self.skipped += 1
+                return False
+            slot = self._free_slots.pop(0)
+            self.submitted += 1
+            frame_id = self.submitted if frame_id is None else frame_id
+            self._pending[slot] = (frame, time.monotonic())
+
+        offset = slot * self._slot_size
+        view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self._memory.buf, offset=offset)
+        np.copyto(view, frame)
+        del view
+        self._tasks.put((self._memory.name, slot, offset, frame.shape, frame.dtype.str, frame_id, timestamp))
+        return True
+
+    def poll(self):
+        """Returns the newest LandmarkResult that hasn't been returned yet, or None."""
+        with self._lock:
+            latest, self._latest = self._latest, None
+        return latest
+
+    def wait_result(self, timeout=None):
+        """Like ``poll``, but waits up to ``timeout`` seconds for a frame the worker is still processing."""
+        with self._result_ready:
+            self._result_ready.wait_for(
+                lambda: self._latest is not None or not self._pending or self._error is not None, timeout
+            )
+            latest, self._latest = self._latest, None
+            if latest is None:
+                self._check()
+        return latest
+
+    def warm_up(self, frame_size=None, timeout=30.0):
+        """Waits until the worker has loaded and warmed up its Landmarker, raises a RuntimeError if it
+        failed or didn't finish in time.
+
+        The worker warms up as soon as it starts, before the frame size is known, so ``frame_size`` is unused.
+        """
+        if not self._ready.wait(timeout):
+            raise RuntimeError(f"The inference worker wasn't ready after {timeout:g} seconds")
+        self._check()
+
+    @property
+    def stats(self):
+        return {
+            "submitted": self.submitted,
+            "skipped": self.skipped,
+            "completed": self.completed,
+            "mean_latency": self.total_latency / self.completed if self.completed else 0.0,
+        }
+
+    def close(self):
+        self._closing = True
+        self._tasks.put(None)
+        self._reader.join(timeout=5.0)
+        self._process.join(timeout=5.0)
+        if self._process.is_alive():
+            self._process.terminate()
+        if self._memory is not None:
+            self._memory.close()
+            self._memory.unlink()
@@ -0,0 +1,166 @@
+import threading
+import time
+
+
+LEFT = "left"
+RIGHT = "right"
+
+
+class Injector:
+    """Base class for everything that sends mouse input.
+
+    Keeps track of pressed buttons so redundant presses and releases never
+    reach the backend. ``move`` only remembers the newest position, ``flush``
+    sends it, so there is at most one move per output tick. Backends
+    implement ``_move``, ``_press``, ``_release``, ``_click`` and ``_position``.
+    """
+
+    def __init__(self) -> None:
+        self.pressed = set()
+        self.sent = 0
+        self.suppressed = 0
+        self.coalesced = 0
+        self._pending_move = None
+        self._last_move = None
+        self._lock = threading.Lock()
+
+    def move(self, x, y):
+        with self._lock:
+            if self._pending_move is not None:
+                self.coalesced += 1
+            self._pending_move = (int(x), int(y))
+
+    def _flush(self):
+        move, self._pending_move = self._pending_move, None
+        if move is None:
+            return
+        if move == self._last_move:
+            self.suppressed += 1
+            return
+        self._move(*move)
+        self._last_move = move
+        self.sent += 1
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def press(self, button=LEFT):
+        with self._lock:
+            if button in self.pressed:
+                self.suppressed += 1
+                return
+            self._flush()
+            self._press(button)
+            self.pressed.add(button)
+            self.sent += 1
+
+    def release(self, button=LEFT):
+        with self._lock:
+            if button not in self.pressed:
+                self.suppressed += 1
+                return
+            self._flush()
+            self._release(button)
+            self.pressed.discard(button)
+            self.sent += 1
+
+    def click(self, button=LEFT):
+        with self._lock:
+            self._flush()
+            if button in self.pressed:
+                self._release(button)
+                self.pressed.discard(button)
+            self._click(button)
+            self.sent += 1
+
+    def release_all(self):
+        for button in list(self.pressed):
+            self.release(button)
+
+    def position(self):
+        with self._lock:
+            return self._position()
+
+    @property
+    def stats(self):
+        return {"sent": self.sent, "suppressed": self.suppressed, "coalesced": self.coalesced}
+
+    def _move(self, x, y):
+        raise NotImplementedError
+
+    def _press(self, button):
+        raise NotImplementedError
+
+    def _release(self, button):
+        raise NotImplementedError
+
+    def _click(self, button):
+        raise NotImplementedError
+
+    def _position(self):
+        raise NotImplementedError
+
+
+class PynputInjector(Injector):
+    def __init__(self) -> None:
+        super().__init__()
+        from pynput.mouse import Button, Controller
+
+        self.controller = Controller()
+        self.buttons = {LEFT: Button.left, RIGHT: Button.right}
+
+    def _move(self, x, y):
+        self.controller.position = (x, y)
+
+    def _press(self, button):
+        self.controller.press(self.buttons[button])
+
+    def _release(self, button):
+        self.controller.release(self.buttons[button])
+
+    def _click(self, button):
+        self.controller.click(self.buttons[button], 1)
+
+    def _position(self):
+        return self.controller.position
+
+
+class MockInjector(Injector):
+    """Records events as ``(timestamp, kind, args)`` instead of sending them, for headless runs and benchmarks."""
+
+    def __init__(self, position=(0, 0)) -> None:
+        super().__init__()
+        self.events = []
+        self._current = position
+
+    def _record(self, kind, *args):
+        self.events.append((time.monotonic(), kind, args))
+
+    def _move(self, x, y):
+        self._current = (x, y)
+        self._record("move", x, y)
+
+    def _press(self, button):
+        self._record("press", button)
+
+    def _release(self, button):
+        self._record("release", button)
+
+    def _click(self, button):
+        self._record("click", button)
+
+    def _position(self):
+        return self._current
+
+
+INJECTORS = {
+    "pynput": PynputInjector,
+    "mock": MockInjector,
+}
+
+
+def create_injector(name="pynput"):
+    if name not in INJECTORS:
+        raise ValueError(f"Unknown injector {name!r}, choose one of {', '.join(INJECTORS)}")
+    return INJECTORS[name]()
@@ -1,38 +1,299 @@
-import mediapipe as mp
+import collections
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# mediapipe takes a while to import, it's only loaded once a Landmarker is created
+mp = None
+
+MODEL_PATH = "hand_landmarker.task"
+MODEL_URL = "https://storage.googleapis.com/mediapipe-models/hand_landmarker/hand_landmarker/float16/latest/hand_landmarker.task"
+
+HANDEDNESS = {"Left": 0, "Right": 1}
+
+# one finished detection, paired with the frame it was computed on
+LandmarkResult = collections.namedtuple(
+    "LandmarkResult", ["frame_id", "timestamp", "frame", "landmarks", "handedness", "latency"]
+)
+
+
+def _import_mediapipe():
+    global mp
+    if mp is None:
+        import mediapipe
+
+        mp = mediapipe
+    return mp
+
+
+def ensure_model(path=MODEL_PATH):
+    """Downloads the hand landmarker model unless it's already there."""
+    if os.path.exists(path):
+        return
+    import requests
+    from tqdm import tqdm
+
+    resp = requests.get(MODEL_URL, stream=True)
+    total = int(resp.headers.get('content-length', 0))
+    # download next to the destination first so an interrupted download isn't mistaken for the model
+    temporary_path = f"{path}.part"
+    with open(temporary_path, 'wb') as file, tqdm(
+            desc=os.path.basename(path),
+            total=total,
+            unit='iB',
+            unit_scale=True,
+            unit_divisor=1024,
+    ) as bar:
+        for data in resp.iter_content(chunk_size=1024):
+            size = file.write(data)
+            bar.update(size)
+    os.replace(temporary_path, path)
+
+
+def result_to_arrays(result: "mp.tasks.vision.HandLandmarkerResult"):
+    """Converts a HandLandmarkerResult into a (N, 21, 3) float32 landmark array and a (N,) int8 handedness array."""
+    landmarks = np.array(
+        [[(landmark.x, landmark.y, landmark.z) for landmark in hand] for hand in result.hand_landmarks],
+        dtype=np.float32,
+    ).reshape(-1, 21, 3)
+    handedness = np.array(
+        [HANDEDNESS.get(categories[0].category_name, -1) if categories else -1 for categories in result.handedness],
+        dtype=np.int8,
+    )
+    return landmarks, handedness
+
+
+# names of mediapipe's RunningMode members
+RUNNING_MODES = {
+    "live_stream": "LIVE_STREAM",
+    "video": "VIDEO",
+    "image": "IMAGE",
+}
 
 
 class Landmarker:
-    def __init__(self) -> None:
+    """Runs the hand landmarker.
+
+    In ``live_stream`` mode frames are submitted with ``detect_async``. At
+    most ``max_in_flight`` frames are handed to MediaPipe at once, further
+    frames are skipped until a result comes back. Finished detections are
+    fetched with ``poll``, or ``wait_result`` which blocks until one arrives,
+    and carry the id and frame they were computed on.
+
+    ``input_width`` downscales frames before inference independently of the
+    capture resolution. With ``roi`` enabled only a square of ``roi_size``
+    pixels cropped around the last detected hands (plus ``roi_margin`` of
+    their size on every side) is sent to the model, falling back to the full
+    frame as soon as no hand is found. Landmarks are always returned
+    normalized to the full frame.
+
+    In ``video`` and ``image`` mode ``detect`` runs synchronously and returns
+    the LandmarkResult directly.
+
+    Looking for a single hand (``num_hands``) is the cheapest, every further
+    hand costs extra inference time. ``warm_up`` runs the first, slow
+    inference ahead of time.
+    """
+
+    def __init__(self, max_in_flight=1, pending_timeout=1.0, input_width=None, roi=False, roi_margin=0.3,
+                 roi_size=256, running_mode="live_stream", num_hands=1) -> None:
+        _import_mediapipe()
         self.result = None
         self.landmarker = mp.tasks.vision.HandLandmarker
         self.timestamp = 0
+        # (first frame timestamp in seconds, its MediaPipe timestamp in ms), see _next_timestamp_ms
+        self._timestamp_origin = None
+        self.max_in_flight = max_in_flight
+        self.pending_timeout = pending_timeout
+        self.input_width = input_width
+        self.roi = roi
+        self.roi_margin = roi_margin
+        self.roi_size = roi_size
+        self.running_mode = running_mode
+        self.num_hands = num_hands
+        self.roi_frames = 0
+        self.submitted = 0
+        self.skipped = 0
+        self.completed = 0
+        self.total_latency = 0.0
+        self._pending = {}
+        self._latest = None
+        self._roi_box = None
+        self._lock = threading.Lock()
+        self._result_ready = threading.Condition(self._lock)
         self.create_landmarker()
 
     def create_landmarker(self):
-        def update_result(result: mp.tasks.vision.HandLandmarkerResult, output_image: mp.Image, timestamp_ms: int):
-            self.result = result
+        def update_result(result: "mp.tasks.vision.HandLandmarkerResult", output_image: "mp.Image", timestamp_ms: int):
+            with self._lock:
+                # results arrive in order, anything older was dropped by MediaPipe
+                for ts in [ts for ts in self._pending if ts < timestamp_ms]:
+                    del self._pending[ts]
+                pending = self._pending.pop(timestamp_ms, None)
+                if pending is None:
+                    return
+                self._latest = self._finish(result, pending)
+                self._result_ready.notify_all()
 
         base_options = mp.tasks.BaseOptions(
-            model_asset_path="hand_landmarker.task",
+            model_asset_path=MODEL_PATH,
             # delegate=mp.tasks.BaseOptions.Delegate.GPU # Enable when using a GPU
         )
 
         options = mp.tasks.vision.HandLandmarkerOptions(
             base_options=base_options,
-            running_mode=mp.tasks.vision.RunningMode.LIVE_STREAM,
-            num_hands=2,
+            running_mode=getattr(mp.tasks.vision.RunningMode, RUNNING_MODES[self.running_mode]),
+            num_hands=self.num_hands,
             min_hand_detection_confidence=0.5,
             min_hand_presence_confidence=0.5,
             min_tracking_confidence=0.5,
-            result_callback=update_result
+            result_callback=update_result if self.running_mode == "live_stream" else None
         )
 
         self.landmarker = self.landmarker.create_from_options(options)
 
-    def detect_async(self, frame):
-        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=frame)
-        self.timestamp += 1
-        self.landmarker.detect_async(image=mp_image, timestamp_ms=self.timestamp)
+    @property
+    def in_flight(self):
+        return len(self._pending)
+
+    def _next_timestamp_ms(self, timestamp):
+        # frames are timed from the first one on, so file sources starting at 0 keep
+        # their spacing after the warm-up frame. MediaPipe needs strictly increasing timestamps
+        if self._timestamp_origin is None:
+            self._timestamp_origin = (timestamp, self.timestamp + 1)
+        first, first_ms = self._timestamp_origin
+        self.timestamp = max(first_ms + int(round((timestamp - first) * 1000)), self.timestamp + 1)
+        return self.timestamp
+
+    def _finish(self, result, pending):
+        """Builds the LandmarkResult for a finished detection, with landmarks mapped back to the full frame."""
+        landmarks, handedness = result_to_arrays(result)
+        frame_id, timestamp, submitted_at, frame, transform = pending
+        offset_x, offset_y, scale_x, scale_y = transform
+        if len(landmarks):
+            landmarks[..., 0] = offset_x + landmarks[..., 0] * scale_x
+            landmarks[..., 1] = offset_y + landmarks[..., 1] * scale_y
+            landmarks[..., 2] *= scale_x
+            self._roi_box = (landmarks[..., 0].min(), landmarks[..., 1].min(),
+                             landmarks[..., 0].max(), landmarks[..., 1].max())
+        else:
+            # tracking lost, search the whole frame again
+            self._roi_box = None
+        latency = time.monotonic() - submitted_at
+        self.completed += 1
+        self.total_latency += latency
+        self.result = result
+        return LandmarkResult(frame_id, timestamp, frame, landmarks, handedness, latency)
+
+    def _prepare(self, frame):
+        """Returns the image to run inference on and the (offset_x, offset_y, scale_x, scale_y)
+        mapping its normalized coordinates back to the full frame."""
+        height, width = frame.shape[:2]
+        box = self._roi_box if self.roi else None
+        if box is not None:
+            x_min, y_min, x_max, y_max = box
+            size = max((x_max - x_min) * width, (y_max - y_min) * height) * (1 + 2 * self.roi_margin)
+            size = int(max(size, self.roi_size / 2))
+            if size < min(width, height):
+                center_x = (x_min + x_max) / 2 * width
+                center_y = (y_min + y_max) / 2 * height
+                x0 = int(min(max(center_x - size / 2, 0), width - size))
+                y0 = int(min(max(center_y - size / 2, 0), height - size))
+                crop = frame[y0:y0 + size, x0:x0 + size]
+                image = cv2.resize(crop, (self.roi_size, self.roi_size), interpolation=cv2.INTER_AREA)
+                self.roi_frames += 1
+                return image, (x0 / width, y0 / height, size / width, size / height)
+
+        if self.input_width and width > self.input_width:
+            input_height = round(height * self.input_width / width)
+            frame = cv2.resize(frame, (self.input_width, input_height), interpolation=cv2.INTER_AREA)
+        return frame, (0.0, 0.0, 1.0, 1.0)
+
+    def detect_async(self, frame, frame_id=None, timestamp=None):
+        """Submits a frame for detection. Returns False if it was skipped because the model is busy."""
+        now = time.monotonic()
+        timestamp = now if timestamp is None else timestamp
+        with self._lock:
+            for ts, pending in list(self._pending.items()):
+                if now - pending[2] > self.pending_timeout:
+                    del self._pending[ts]
+            if len(self._pending) >= self.max_in_flight:
+                self.skipped += 1
+                return False
+
+            timestamp_ms = self._next_timestamp_ms(timestamp)
+            self.submitted += 1
+            frame_id = self.submitted if frame_id is None else frame_id
+            image, transform = self._prepare(frame)
+            self._pending[timestamp_ms] = (frame_id, timestamp, now, frame, transform)
+
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=np.ascontiguousarray(image))
+        try:
+            self.landmarker.detect_async(image=mp_image, timestamp_ms=timestamp_ms)
+        except Exception:
+            with self._lock:
+                self._pending.pop(timestamp_ms, None)
+            raise
+        return True
+
+    def detect(self, frame, frame_id=None, timestamp=None):
+        """Runs detection synchronously in video or image mode and returns the LandmarkResult."""
+        now = time.monotonic()
+        timestamp = now if timestamp is None else timestamp
+        self.submitted += 1
+        frame_id = self.submitted if frame_id is None else frame_id
+        image, transform = self._prepare(frame)
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=np.ascontiguousarray(image))
+        if self.running_mode == "video":
+            result = self.landmarker.detect_for_video(mp_image, self._next_timestamp_ms(timestamp))
+        else:
+            result = self.landmarker.detect(mp_image)
+        return self._finish(result, (frame_id, timestamp, now, frame, transform))
+
+    def poll(self):
+        """Returns the newest LandmarkResult that hasn't been returned yet, or None."""
+        with self._lock:
+            latest, self._latest = self._latest, None
+        return latest
+
+    def wait_result(self, timeout=None):
+        """Like ``poll``, but waits up to ``timeout`` seconds for a frame that is still being processed."""
+        with self._result_ready:
+            self._result_ready.wait_for(lambda: self._latest is not None or not self._pending, timeout)
+            latest, self._latest = self._latest, None
+        return latest
+
+    def warm_up(self, frame_size=None, timeout=5.0):
+        """Runs one inference on a blank frame of ``frame_size`` (width, height) so the graph is
+        initialized before the first real frame."""
+        width, height = frame_size or (640, 480)
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        if self.running_mode == "live_stream":
+            self.detect_async(frame)
+            self.wait_result(timeout)
+        else:
+            self.detect(frame)
+        # the warm-up frame doesn't count towards the stats
+        with self._lock:
+            self._latest = None
+            self._pending.clear()
+            self.submitted = self.completed = 0
+            self.total_latency = 0.0
+            self._roi_box = None
+            self._timestamp_origin = None
+
+    @property
+    def stats(self):
+        return {
+            "submitted": self.submitted,
+            "skipped": self.skipped,
+            "completed": self.completed,
+            "roi_frames": self.roi_frames,
+            "mean_latency": self.total_latency / self.completed if self.completed else 0.0,
+        }
 
     def close(self):
         self.landmarker.close()
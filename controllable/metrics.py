@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from .filters import RingBuffer
+
+
+class Metrics:
+    """Per-stage timings, event rates, counters and gauges of the pipeline.
+
+    Stage timings keep the last ``window`` samples for p50/p95/p99 and the
+    count and sum of all samples since the start, rates are computed from
+    the timestamps of the last ``window`` events. While ``enabled`` is False
+    every method returns right away, so instrumented code costs almost
+    nothing.
+    """
+
+    def __init__(self, enabled=False, window=512) -> None:
+        self.enabled = enabled
+        self.window = window
+        self.timings = {}
+        # stage -> [count, sum in ms] of every sample, not just the window
+        self.totals = {}
+        self.events = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def now(self):
+        return time.perf_counter() if self.enabled else 0.0
+
+    def record(self, stage, start):
+        """Records the time since ``start`` (from ``now``) for a stage."""
+        if not self.enabled:
+            return
+        self.record_duration(stage, time.perf_counter() - start)
+
+    def record_duration(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            if stage not in self.timings:
+                self.timings[stage] = RingBuffer(self.window, dim=1)
+                self.totals[stage] = [0, 0.0]
+            self.timings[stage].append(seconds * 1000)
+            totals = self.totals[stage]
+            totals[0] += 1
+            totals[1] += seconds * 1000
+
+    def tick(self, name):
+        """Marks one event, e.g. a finished inference, for the rate of ``name``."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if name not in self.events:
+                self.events[name] = RingBuffer(self.window, dim=1)
+            self.events[name].append(time.perf_counter())
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        if not self.enabled:
+            return
+        self.gauges[name] = value
+
+    def snapshot(self):
+        now = time.perf_counter()
+        with self._lock:
+            stages = {}
+            for stage, buffer in self.timings.items():
+                samples = buffer.latest()[:, 0]
+                p50, p95, p99 = np.percentile(samples, (50, 95, 99))
+                count, total = self.totals[stage]
+                stages[stage] = {"p50": p50, "p95": p95, "p99": p99, "count": count, "sum": total}
+            rates = {}
+            for name, buffer in self.events.items():
+                times = buffer.latest()[:, 0]
+                # an event stream that stopped decays to zero instead of freezing at its last rate
+                span = now - times[0]
+                rates[name] = (len(times) - 1) / span if len(times) > 1 and span > 0 else 0.0
+            return {
+                "stages": stages,
+                "rates": rates,
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+            }
+
+    def format_text(self):
+        """Human readable summary for the stats overlay."""
+        snapshot = self.snapshot()
+        lines = [f"{name} {rate:.1f}/s" for name, rate in sorted(snapshot["rates"].items())]
+        for stage, stats in sorted(snapshot["stages"].items()):
+            lines.append(f"{stage}: p50 {stats['p50']:.1f} p95 {stats['p95']:.1f} p99 {stats['p99']:.1f} ms")
+        for name, value in sorted({**snapshot["counters"], **snapshot["gauges"]}.items()):
+            lines.append(f"{name}: {value}")
+        return "\n".join(lines)
+
+    def prometheus_text(self):
+        snapshot = self.snapshot()
+        lines = [
+            "# TYPE controllable_stage_milliseconds summary",
+        ]
+        for stage, stats in sorted(snapshot["stages"].items()):
+            for quantile in ("p50", "p95", "p99"):
+                value = stats[quantile]
+                lines.append(
+                    f'controllable_stage_milliseconds{{stage="{stage}",quantile="0.{quantile[1:]}"}} {value:.3f}'
+                )
+            lines.append(f'controllable_stage_milliseconds_sum{{stage="{stage}"}} {stats["sum"]:.3f}')
+            lines.append(f'controllable_stage_milliseconds_count{{stage="{stage}"}} {stats["count"]}')
+        lines.append("# TYPE controllable_rate_per_second gauge")
+        for name, rate in sorted(snapshot["rates"].items()):
+            lines.append(f'controllable_rate_per_second{{name="{name}"}} {rate:.3f}')
+        lines.append("# TYPE controllable_total counter")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f'controllable_total{{name="{name}"}} {value}')
+        lines.append("# TYPE controllable_value gauge")
+        for name, value in sorted(snapshot["gauges"].items()):
+            lines.append(f'controllable_value{{name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Writes the metrics in Prometheus text format to ``path`` every ``interval``
+    seconds and/or serves them at ``http://127.0.0.1:<port>/metrics``."""
+
+    def __init__(self, metrics, path=None, port=None, interval=5.0) -> None:
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.server = None
+        self._stop = threading.Event()
+
+        if port is not None:
+            exporter_metrics = metrics
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path != "/metrics":
+                        self.send_error(404)
+                        return
+                    body = exporter_metrics.prometheus_text().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        if path is not None:
+            threading.Thread(target=self._write_loop, daemon=True).start()
+
+    def _write_loop(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self):
+        # write to a temporary file first so readers never see a half written file
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as file:
+            file.write(self.metrics.prometheus_text())
+        os.replace(temporary_path, self.path)
+
+    def stop(self):
+        self._stop.set()
+        if self.server is not None:
+            self.server.shutdown()
+        if self.path is not None:
+            self.write()
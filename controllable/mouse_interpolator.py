@@ -1,50 +1,120 @@
-import os.path
+import math
 import time
 import threading
-import queue
-import pyautogui
+
+from .filters import RingBuffer
+
 
 class MouseInterpolator:
-    def __init__(self, steps=10, sleep_time=0.005) -> None:
-        pyautogui.PAUSE = 0
-        pyautogui.FAILSAFE = False
-        self.target_queue = queue.Queue(maxsize=1)
+    """Moves the cursor towards the latest target on a fixed schedule.
+
+    The cursor is updated every ``1 / rate`` seconds, which should match the
+    display refresh rate. Targets carry the capture timestamp of their frame,
+    the hand's velocity is estimated from the targets of the last
+    ``velocity_window`` seconds and extrapolated over the time since capture
+    (at most ``max_prediction`` seconds) to make up for the pipeline latency.
+    The cursor approaches that point with a time constant of ``smoothing``
+    seconds, so a new target bends the current motion instead of restarting
+    it. Once the cursor has settled the thread sleeps until the next target.
+    Moves are sent through ``injector``, flushed once per tick.
+    """
+
+    def __init__(self, injector, rate=60.0, smoothing=0.03, max_prediction=0.1, velocity_window=0.1,
+                 metrics=None) -> None:
+        self.injector = injector
+        self.metrics = metrics
+        self.rate = rate
+        self.smoothing = smoothing
+        self.max_prediction = max_prediction
+        self.velocity_window = velocity_window
         self.running = True
-        self.steps = steps
-        self.sleep_time = sleep_time
+        self.latency = 0.0
+        self.updates = 0
+        self._targets = RingBuffer(8, dim=3)
+        self._target = None
+        self._target_time = 0.0
+        self._received_time = 0.0
+        self._condition = threading.Condition()
         self.interpolation_thread = threading.Thread(target=self._interpolate_movement, daemon=True)
         self.interpolation_thread.start()
 
+    def _velocity(self, now):
+        if now - self._received_time > self.velocity_window or len(self._targets) < 2:
+            # the hand stopped or was lost, don't keep drifting
+            return 0.0, 0.0
+        samples = self._targets.latest()
+        recent = samples[samples[:, 0] >= samples[-1, 0] - self.velocity_window]
+        if len(recent) < 2 or recent[-1, 0] <= recent[0, 0]:
+            return 0.0, 0.0
+        dt = recent[-1, 0] - recent[0, 0]
+        return (recent[-1, 1] - recent[0, 1]) / dt, (recent[-1, 2] - recent[0, 2]) / dt
+
     def _interpolate_movement(self):
-        current_x, current_y = pyautogui.position()
+        period = 1 / self.rate
+        current_x = current_y = None
+        settled = True
+        last_received = 0.0
+        next_tick = time.monotonic()
         while self.running:
-            try:
-                target_x, target_y = self.target_queue.get(timeout=0.01)
-                for step in range(1, self.steps + 1):
+            with self._condition:
+                if settled:
+                    self._condition.wait_for(lambda: not self.running or self._received_time != last_received)
                     if not self.running:
                         break
-                    
-                    t = step / self.steps
-                    t = 1- (1 - t) ** 2
-                    interp_x = current_x + (target_x - current_x) * t
-                    interp_y = current_y + (target_y - current_y) * t
-                    try:
-                        pyautogui.moveTo(int(interp_x), int(interp_y), _pause=False)
-                    except RuntimeError:
-                        pass
-                    time.sleep(self.sleep_time)
-                current_x, current_y = target_x, target_y
-            except queue.Empty:
-                current_x, current_y = pyautogui.position()
-                
-    def move_to(self, x, y):
-        try:
-            self.target_queue.get_nowait()
-        except queue.Empty:
-            pass
-        self.target_queue.put((x, y))
-        
+                    next_tick = max(next_tick, time.monotonic())
+                    # the mouse may have been moved by hand in the meantime
+                    current_x = current_y = None
+                last_received = self._received_time
+                now = time.monotonic()
+                target_x, target_y = self._target
+                velocity_x, velocity_y = self._velocity(now)
+                horizon = min(max(now - self._target_time, 0.0), self.max_prediction)
+
+            if current_x is None:
+                current_x, current_y = self.injector.position()
+
+            goal_x = target_x + velocity_x * horizon
+            goal_y = target_y + velocity_y * horizon
+            alpha = 1 - math.exp(-period / self.smoothing)
+            new_x = current_x + (goal_x - current_x) * alpha
+            new_y = current_y + (goal_y - current_y) * alpha
+            if (int(new_x), int(new_y)) != (int(current_x), int(current_y)):
+                self.injector.move(new_x, new_y)
+                start = self.metrics.now() if self.metrics else 0.0
+                try:
+                    self.injector.flush()
+                    self.updates += 1
+                except RuntimeError:
+                    pass
+                if self.metrics:
+                    self.metrics.record("cursor_move", start)
+                    self.metrics.tick("cursor")
+            current_x, current_y = new_x, new_y
+            settled = velocity_x == velocity_y == 0.0 and abs(goal_x - current_x) < 0.5 and abs(goal_y - current_y) < 0.5
+
+            next_tick += period
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # fell behind, don't try to catch up with a burst of updates
+                next_tick = time.monotonic()
+
+    def move_to(self, x, y, timestamp=None):
+        """Sets a new target, ``timestamp`` is when the frame it was computed from was captured."""
+        now = time.monotonic()
+        timestamp = now if timestamp is None else timestamp
+        with self._condition:
+            self._target = (x, y)
+            self._target_time = timestamp
+            self._received_time = now
+            self._targets.append((timestamp, x, y))
+            self.latency = 0.9 * self.latency + 0.1 * max(now - timestamp, 0.0)
+            self._condition.notify_all()
+
     def stop(self):
-        self.running = False
+        with self._condition:
+            self.running = False
+            self._condition.notify_all()
         if self.interpolation_thread.is_alive():
-            self.interpolation_thread.join(timeout=1.0)
\ No newline at end of file
+            self.interpolation_thread.join(timeout=1.0)
@@ -0,0 +1,92 @@
+import argparse
+import itertools
+import json
+import sys
+import time
+
+import numpy as np
+
+from .cli import resolution
+from .sources import CameraSource
+
+
+FOURCCS = ("MJPG", "YUYV")
+RESOLUTIONS = ((640, 480), (1280, 720), (1920, 1080))
+CAMERA_FPS = (30, 60)
+
+
+def measure(source, frames=90, warm_up=10):
+    """Reads ``frames`` frames after ``warm_up`` discarded ones, returns the achieved FPS and read latencies in ms."""
+    for _ in range(warm_up):
+        source.read()
+    durations = []
+    failed = 0
+    start = time.perf_counter()
+    for _ in range(frames):
+        read_start = time.perf_counter()
+        ret, _ = source.read()
+        durations.append(time.perf_counter() - read_start)
+        failed += not ret
+    elapsed = time.perf_counter() - start
+    p50, p95 = np.percentile(np.array(durations) * 1000, (50, 95))
+    return {"achieved_fps": (frames - failed) / elapsed, "read_p50_ms": p50, "read_p95_ms": p95, "failed_reads": failed}
+
+
+def probe(index=0, fourccs=FOURCCS, resolutions=RESOLUTIONS, rates=CAMERA_FPS, buffer_size=1, frames=90):
+    """Tries every combination of capture settings and yields one result per mode the camera actually negotiated."""
+    seen = set()
+    for fourcc, size, rate in itertools.product(fourccs, resolutions, rates):
+        source = CameraSource(index, fourcc=fourcc, resolution=size, camera_fps=rate, buffer_size=buffer_size)
+        try:
+            if not source.isOpened():
+                raise RuntimeError(f"Couldn't open camera {index}")
+            mode = source.mode
+            key = (mode["fourcc"], mode["width"], mode["height"], mode["fps"])
+            # the driver fell back to a mode that was already measured
+            if key in seen:
+                continue
+            seen.add(key)
+            yield {"requested": {"fourcc": fourcc, "width": size[0], "height": size[1], "fps": rate},
+                   **mode, **measure(source, frames)}
+        finally:
+            source.release()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="controllable-probe",
+                                     description="Measure which capture modes a camera supports and how fast they are.")
+    parser.add_argument("--camera", type=int, default=0, help="camera index (default: 0)")
+    parser.add_argument("--formats", nargs="+", default=FOURCCS, metavar="FOURCC",
+                        help=f"pixel formats to try (default: {' '.join(FOURCCS)})")
+    parser.add_argument("--resolutions", nargs="+", type=resolution, default=RESOLUTIONS, metavar="WxH",
+                        help="resolutions to try (default: 640x480 1280x720 1920x1080)")
+    parser.add_argument("--rates", nargs="+", type=float, default=CAMERA_FPS, metavar="FPS",
+                        help="frame rates to try (default: 30 60)")
+    parser.add_argument("--frames", type=int, default=90, help="frames to read per mode (default: 90)")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'format':<7} {'size':>10} {'fps':>6} {'achieved':>9} {'read p50':>9} {'read p95':>9}")
+    try:
+        for result in probe(args.camera, args.formats, args.resolutions, args.rates, frames=args.frames):
+            results.append(result)
+            print(f"{result['fourcc'] or '?':<7} {result['width']:>5}x{result['height']:<4} {result['fps']:>6g} "
+                  f"{result['achieved_fps']:>9.1f} {result['read_p50_ms']:>7.1f}ms {result['read_p95_ms']:>7.1f}ms")
+    except RuntimeError as error:
+        print(error)
+        return 1
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+    if results:
+        # the fastest mode wins, among equally fast ones the smallest is cheapest to process
+        best = max(results, key=lambda result: (round(result["achieved_fps"]), -result["width"] * result["height"]))
+        print(f"\nFastest: --camera-format {best['fourcc']} --resolution {best['width']}x{best['height']} "
+              f"--camera-fps {best['fps']:g}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+import json
+import os
+import time
+
+
+PROFILE_VERSION = 1
+
+
+def default_path():
+    if os.name == "nt":
+        base = os.environ.get("APPDATA", os.path.expanduser("~"))
+    else:
+        base = os.environ.get("XDG_CONFIG_HOME", os.path.join(os.path.expanduser("~"), ".config"))
+    return os.path.join(base, "controllable", "profiles.json")
+
+
+def profile_key(camera, user=None):
+    return f"{camera}|{user or 'default'}"
+
+
+def _load_all(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_profile(camera, user=None, path=None):
+    """Returns the calibration profile saved for a camera and user, or None."""
+    profile = _load_all(path or default_path()).get(profile_key(camera, user))
+    # profiles from an older format measured distances differently
+    if not profile or profile.get("version") != PROFILE_VERSION:
+        return None
+    return profile
+
+
+def save_profile(camera, profile, user=None, path=None):
+    path = path or default_path()
+    profiles = _load_all(path)
+    profiles[profile_key(camera, user)] = dict(profile, version=PROFILE_VERSION, saved=time.time())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as file:
+        json.dump(profiles, file, indent=2)
+    os.replace(temporary_path, path)
@@ -0,0 +1,293 @@
+import argparse
+import collections
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+
+MAGIC = b"CTRL"
+LAYOUT_VERSION = 2
+
+HEADER = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u4"),
+    # process of the publisher that created the block
+    ("pid", "<u4"),
+    ("slots", "<u4"),
+    ("max_hands", "<u4"),
+    ("width", "<u4"),
+    ("height", "<u4"),
+    ("slot_size", "<u8"),
+    # number of frames published so far, the newest one is in slot (latest - 1) % slots
+    ("latest", "<u8"),
+], align=True)
+
+
+def _slot_meta(max_hands):
+    return np.dtype([
+        # seqlock: odd while the slot is being written, 2 * n + 2 once frame n is complete
+        ("seq", "<u8"),
+        ("frame_id", "<i8"),
+        ("timestamp", "<f8"),
+        ("hand_count", "<u4"),
+        ("handedness", "i1", (max_hands,)),
+        ("landmarks", "<f4", (max_hands, 21, 3)),
+    ], align=True)
+
+
+def _align(size, alignment=64):
+    return (size + alignment - 1) // alignment * alignment
+
+
+def _sizes(slots, max_hands, width, height):
+    """Returns the offset of the first slot, the size of the metadata in a slot, the size of a slot and the total size."""
+    base = _align(HEADER.itemsize)
+    meta_size = _align(_slot_meta(max_hands).itemsize)
+    slot_size = meta_size + _align(width * height * 3)
+    return base, meta_size, slot_size, base + slots * slot_size
+
+
+# one frame read from the ring, ``frame`` and the arrays are views into shared memory unless copied
+PublishedFrame = collections.namedtuple(
+    "PublishedFrame", ["seq", "frame_id", "timestamp", "frame", "landmarks", "handedness"]
+)
+
+
+class _Layout:
+    def __init__(self, buffer, slots, max_hands, width, height) -> None:
+        self.header = np.ndarray((), dtype=HEADER, buffer=buffer)
+        meta = _slot_meta(max_hands)
+        base, meta_size, slot_size, self.size = _sizes(slots, max_hands, width, height)
+        self.meta = [np.ndarray((), dtype=meta, buffer=buffer, offset=base + slot * slot_size) for slot in range(slots)]
+        self.pixels = [
+            np.ndarray((height, width, 3), dtype=np.uint8, buffer=buffer, offset=base + slot * slot_size + meta_size)
+            for slot in range(slots)
+        ]
+        self.slot_size = slot_size
+
+
+def _running(pid):
+    if sys.platform == "win32":
+        # Windows frees the block with its last handle, one that still exists is in use
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _forget(memory):
+    """Keeps this process from unlinking an attached block of another process when it exits."""
+    if sys.platform != "win32":
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(memory._name, "shared_memory")
+
+
+class FramePublisher:
+    """Publishes annotated frames and their landmarks to a shared memory ring for other local processes.
+
+    The block named ``name`` is created on the first frame and sized for that
+    frame, later frames of another size are scaled to it. It holds a header
+    (see ``HEADER``) and ``slots`` slots, each a metadata record followed by
+    the BGR pixels. Writing never waits for readers: every slot has a seqlock
+    counter that is odd while the slot is written, readers retry or skip a
+    frame that changed under them. FrameSubscriber is the matching reader.
+    A block of that name left behind by a publisher that is no longer running
+    is replaced, any other one raises a RuntimeError.
+    """
+
+    def __init__(self, name="controllable", slots=4, max_hands=2) -> None:
+        self.name = name
+        self.slots = slots
+        self.max_hands = max_hands
+        self.published = 0
+        self._memory = None
+        self._layout = None
+        # the block is only created on the first frame, a name that is taken should fail right away
+        self._remove_stale()
+
+    def _remove_stale(self):
+        """Unlinks the block called ``name`` if a publisher that is no longer running left it behind."""
+        try:
+            existing = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            return
+        pid = None
+        if existing.size >= HEADER.itemsize:
+            header = np.ndarray((), dtype=HEADER, buffer=existing.buf)
+            if bytes(header["magic"]) == MAGIC and int(header["version"]) == LAYOUT_VERSION:
+                pid = int(header["pid"])
+            del header
+        if pid is not None and not _running(pid):
+            existing.close()
+            existing.unlink()
+            return
+        _forget(existing)
+        existing.close()
+        if pid is None:
+            raise RuntimeError(f"Shared memory {self.name!r} already exists and wasn't created by this version "
+                               f"of Controllable, publish under another name")
+        raise RuntimeError(f"Shared memory {self.name!r} is in use by Controllable process {pid}, "
+                           f"publish under another name")
+
+    def _create(self, width, height):
+        size = _sizes(self.slots, self.max_hands, width, height)[3]
+        try:
+            self._memory = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            self._remove_stale()
+            self._memory = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        self._layout = _Layout(self._memory.buf, self.slots, self.max_hands, width, height)
+        header = self._layout.header
+        header["magic"] = MAGIC
+        header["version"] = LAYOUT_VERSION
+        header["pid"] = os.getpid()
+        header["slots"] = self.slots
+        header["max_hands"] = self.max_hands
+        header["width"] = width
+        header["height"] = height
+        header["slot_size"] = self._layout.slot_size
+        header["latest"] = 0
+
+    def publish(self, frame, frame_id=-1, timestamp=0.0, landmarks=None, handedness=None):
+        """Writes one BGR frame with its (N, 21, 3) landmarks and (N,) handedness into the next slot.
+
+        ``timestamp`` is the ``time.monotonic()`` the frame was captured at.
+        """
+        if self._layout is None:
+            self._create(frame.shape[1], frame.shape[0])
+        layout = self._layout
+        slot = self.published % self.slots
+        meta, pixels = layout.meta[slot], layout.pixels[slot]
+
+        meta["seq"] = 2 * self.published + 1
+        if frame.shape[:2] != pixels.shape[:2]:
+            cv2.resize(frame, (pixels.shape[1], pixels.shape[0]), dst=pixels, interpolation=cv2.INTER_AREA)
+        else:
+            np.copyto(pixels, frame)
+        count = 0 if landmarks is None else min(len(landmarks), self.max_hands)
+        meta["frame_id"] = frame_id
+        meta["timestamp"] = timestamp
+        meta["hand_count"] = count
+        meta["handedness"][:] = -1
+        meta["landmarks"][:] = np.nan
+        if count:
+            meta["handedness"][:count] = handedness[:count]
+            meta["landmarks"][:count] = landmarks[:count]
+        meta["seq"] = 2 * self.published + 2
+
+        self.published += 1
+        layout.header["latest"] = self.published
+
+    def close(self):
+        if self._memory is None:
+            return
+        self._layout = None
+        self._memory.close()
+        self._memory.unlink()
+        self._memory = None
+
+
+class FrameSubscriber:
+    """Reads the newest frame written by a FramePublisher in another process."""
+
+    def __init__(self, name="controllable") -> None:
+        try:
+            self._memory = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            self._memory = shared_memory.SharedMemory(name=name)
+            # before Python 3.13 the block would be unlinked when this process exits
+            _forget(self._memory)
+        header = np.ndarray((), dtype=HEADER, buffer=self._memory.buf)
+        if bytes(header["magic"]) != MAGIC or int(header["version"]) != LAYOUT_VERSION:
+            self._memory.close()
+            raise ValueError(f"Shared memory {name!r} wasn't written by a compatible FramePublisher")
+        self.slots = int(header["slots"])
+        self._layout = _Layout(self._memory.buf, self.slots, int(header["max_hands"]),
+                               int(header["width"]), int(header["height"]))
+
+    @property
+    def latest(self):
+        return int(self._layout.header["latest"])
+
+    def read(self, copy=True, retries=3):
+        """Returns the newest complete frame as a PublishedFrame, or None if there is none yet.
+
+        With ``copy=False`` the arrays are views into shared memory, check
+        them with ``unchanged`` after use since the publisher may overwrite
+        the slot at any time.
+        """
+        for _ in range(retries):
+            latest = self.latest
+            if latest == 0:
+                return None
+            slot = (latest - 1) % self.slots
+            meta, pixels = self._layout.meta[slot], self._layout.pixels[slot]
+            seq = int(meta["seq"])
+            if seq % 2:
+                continue
+            count = int(meta["hand_count"])
+            frame = pixels.copy() if copy else pixels
+            landmarks = meta["landmarks"][:count]
+            handedness = meta["handedness"][:count]
+            published = PublishedFrame(seq, int(meta["frame_id"]), float(meta["timestamp"]), frame,
+                                       landmarks.copy() if copy else landmarks,
+                                       handedness.copy() if copy else handedness)
+            if not copy or int(meta["seq"]) == seq:
+                return published
+        return None
+
+    def unchanged(self, published):
+        """Whether the slot a ``read(copy=False)`` result points into still holds that frame."""
+        slot = (published.seq // 2 - 1) % self.slots
+        return int(self._layout.meta[slot]["seq"]) == published.seq
+
+    def close(self):
+        self._layout = None
+        self._memory.close()
+
+
+def main(argv=None):
+    """Attaches to a running publisher and prints the frame rate and age of the frames it receives."""
+    parser = argparse.ArgumentParser(prog="python -m controllable.publisher",
+                                     description="Watch the frames published with --publish.")
+    parser.add_argument("name", nargs="?", default="controllable", help="shared memory name (default: controllable)")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between reports (default: 1)")
+    args = parser.parse_args(argv)
+
+    subscriber = FrameSubscriber(args.name)
+    last_seq = None
+    frames = 0
+    ages = []
+    report = time.monotonic() + args.interval
+    try:
+        while True:
+            published = subscriber.read()
+            if published is not None and published.seq != last_seq:
+                last_seq = published.seq
+                frames += 1
+                ages.append(time.monotonic() - published.timestamp)
+            now = time.monotonic()
+            if now >= report:
+                age = f", age {np.median(ages) * 1000:.1f} ms" if ages else ""
+                print(f"{frames / args.interval:.1f} frames/s{age}")
+                frames, ages = 0, []
+                report = now + args.interval
+            time.sleep(0.002)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        subscriber.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
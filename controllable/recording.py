@@ -0,0 +1,168 @@
+import json
+import os
+
+import numpy as np
+
+from .landmarkers import LandmarkResult
+
+
+FORMAT_VERSION = 1
+
+# column name -> dtype, see _row_shape for the shape of one row
+COLUMNS = {
+    "timestamps": np.float64,
+    "frame_ids": np.int64,
+    "hand_counts": np.uint8,
+    "handedness": np.int8,
+    "landmarks": np.float32,
+}
+
+
+def _row_shape(column, max_hands):
+    if column == "handedness":
+        return (max_hands,)
+    if column == "landmarks":
+        return (max_hands, 21, 3)
+    return ()
+
+
+class LandmarkRecorder:
+    """Writes landmark results to a directory of raw, memory-mappable columns.
+
+    Every column is a flat binary file with one fixed-size row per frame, so
+    recordings can be appended to while running and read back with
+    ``np.memmap`` without parsing. Hands beyond ``max_hands`` are dropped and
+    unused hand slots are filled with NaN (landmarks) and -1 (handedness).
+    """
+
+    def __init__(self, path, max_hands=2) -> None:
+        self.path = path
+        self.max_hands = max_hands
+        self.frames = 0
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "meta.json"), "w") as file:
+            json.dump({"version": FORMAT_VERSION, "max_hands": max_hands}, file)
+        self._files = {column: open(os.path.join(path, f"{column}.bin"), "wb") for column in COLUMNS}
+        self._handedness = np.full(max_hands, -1, dtype=np.int8)
+        self._landmarks = np.full((max_hands, 21, 3), np.nan, dtype=np.float32)
+
+    def write(self, result: LandmarkResult):
+        count = min(len(result.landmarks), self.max_hands)
+        self._handedness.fill(-1)
+        self._landmarks.fill(np.nan)
+        self._handedness[:count] = result.handedness[:count]
+        self._landmarks[:count] = result.landmarks[:count]
+
+        self._files["timestamps"].write(np.float64(result.timestamp).tobytes())
+        self._files["frame_ids"].write(np.int64(result.frame_id).tobytes())
+        self._files["hand_counts"].write(np.uint8(count).tobytes())
+        self._files["handedness"].write(self._handedness.tobytes())
+        self._files["landmarks"].write(self._landmarks.tobytes())
+        self.frames += 1
+
+    def close(self):
+        for file in self._files.values():
+            file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class LandmarkRecording:
+    """Memory-mapped, read-only view of a recording made by LandmarkRecorder."""
+
+    def __init__(self, path) -> None:
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as file:
+            meta = json.load(file)
+        if meta["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported recording version {meta['version']} in {path}")
+        self.max_hands = meta["max_hands"]
+
+        frames = None
+        self.columns = {}
+        for column, dtype in COLUMNS.items():
+            row_shape = _row_shape(column, self.max_hands)
+            row_size = np.dtype(dtype).itemsize * int(np.prod(row_shape, dtype=np.int64))
+            file_path = os.path.join(path, f"{column}.bin")
+            rows = os.path.getsize(file_path) // row_size
+            # a recording that was cut off mid-frame is truncated to its complete frames
+            frames = rows if frames is None else min(frames, rows)
+            self.columns[column] = (file_path, dtype, row_shape)
+
+        self.frames = frames
+        for column, (file_path, dtype, row_shape) in self.columns.items():
+            if frames:
+                array = np.memmap(file_path, dtype=dtype, mode="r", shape=(frames,) + row_shape)
+            else:
+                array = np.empty((0,) + row_shape, dtype=dtype)
+            setattr(self, column, array)
+
+    def __len__(self):
+        return self.frames
+
+    def result(self, index, frame=None):
+        count = int(self.hand_counts[index])
+        return LandmarkResult(
+            int(self.frame_ids[index]),
+            float(self.timestamps[index]),
+            frame,
+            np.asarray(self.landmarks[index, :count]),
+            np.asarray(self.handedness[index, :count]),
+            0.0,
+        )
+
+    def __iter__(self):
+        for index in range(self.frames):
+            yield self.result(index)
+
+
+class ReplayLandmarker:
+    """Stands in for Landmarker and hands out recorded results instead of running MediaPipe.
+
+    Every submitted frame is paired with the next recorded result, which keeps
+    its recorded timestamp so gestures behave the same at any replay speed.
+    The result takes over the id of the submitted frame, the tracker measures
+    latencies from that frame's capture time since the recorded timestamps
+    are on the clock of another session.
+    """
+
+    def __init__(self, recording: LandmarkRecording) -> None:
+        self.recording = recording
+        self.index = 0
+        self.in_flight = 0
+        self._latest = None
+
+    @property
+    def finished(self):
+        return self.index >= len(self.recording)
+
+    def detect_async(self, frame, frame_id=None, timestamp=None):
+        if self.finished:
+            return False
+        self._latest = self.recording.result(self.index, frame)
+        if frame_id is not None:
+            self._latest = self._latest._replace(frame_id=frame_id)
+        self.index += 1
+        return True
+
+    def poll(self):
+        latest, self._latest = self._latest, None
+        return latest
+
+    def wait_result(self, timeout=None):
+        # recorded results are there right away
+        return self.poll()
+
+    def warm_up(self, frame_size=None):
+        pass
+
+    @property
+    def stats(self):
+        return {"submitted": self.index, "skipped": 0, "completed": self.index, "mean_latency": 0.0}
+
+    def close(self):
+        pass
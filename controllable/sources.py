@@ -0,0 +1,265 @@
+import os
+import time
+
+import cv2
+import numpy as np
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+def fourcc_to_str(value):
+    """Turns OpenCV's numeric FOURCC into its four letter code, e.g. ``MJPG``."""
+    value = int(value)
+    return "".join(chr((value >> shift) & 0xFF) for shift in (0, 8, 16, 24)).strip("\0 ")
+
+
+class FrameSource:
+    """Base class for everything the pipeline can read frames from.
+
+    Sources behave like ``cv2.VideoCapture``: ``read`` returns ``(ret, frame)``.
+    With ``fps`` set reads are paced to that rate, with ``fps=None`` frames
+    are returned as fast as they can be produced. ``live`` sources (cameras)
+    may drop frames when the pipeline is behind, the others are replayed
+    without losing any. Those are timed by their position in the recording,
+    ``timestamp`` advances by one frame of ``media_fps`` per frame read, so
+    gestures and calibration behave the same at any replay speed.
+    """
+
+    live = False
+
+    def __init__(self, fps=None) -> None:
+        self.fps = fps
+        self.finished = False
+        # position of the last frame read in seconds
+        self.timestamp = 0.0
+        self.frames_read = 0
+        self._next_frame = None
+
+    def _pace(self):
+        if not self.fps:
+            return
+        now = time.monotonic()
+        if self._next_frame is not None and self._next_frame > now:
+            time.sleep(self._next_frame - now)
+            now = self._next_frame
+        self._next_frame = now + 1 / self.fps
+
+    def read(self):
+        if self.finished:
+            return False, None
+        self._pace()
+        ret, frame = self._read()
+        if not ret and not self.live:
+            self.finished = True
+        if ret:
+            self.timestamp = self.frames_read / self.media_fps
+            self.frames_read += 1
+        return ret, frame
+
+    def _read(self):
+        raise NotImplementedError
+
+    def isOpened(self):
+        return True
+
+    @property
+    def media_fps(self):
+        """Frame rate the frames were recorded at."""
+        return self.fps or 30.0
+
+    def release(self):
+        pass
+
+    @property
+    def frame_size(self):
+        """``(width, height)`` of the frames, None if it isn't known before the first frame."""
+        return None
+
+    @property
+    def description(self):
+        return type(self).__name__
+
+
+def _capture_size(cap):
+    width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    return (width, height) if width and height else None
+
+
+class CameraSource(FrameSource):
+    """Reads a camera, optionally asking the driver for a capture mode.
+
+    ``fourcc`` (e.g. ``MJPG``), ``resolution`` as ``(width, height)``,
+    ``camera_fps`` and ``buffer_size`` are requests, drivers silently fall
+    back to the closest mode they support. ``mode`` reports what was
+    actually negotiated.
+    """
+
+    live = True
+
+    def __init__(self, index=0, fps=None, fourcc=None, resolution=None, camera_fps=None, buffer_size=None) -> None:
+        super().__init__(fps)
+        self.index = index
+        self.cap = cv2.VideoCapture(index)
+        self.configure(fourcc, resolution, camera_fps, buffer_size)
+
+    def configure(self, fourcc=None, resolution=None, camera_fps=None, buffer_size=None):
+        # the format has to be set first, the available resolutions and rates depend on it
+        if fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        if resolution:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, resolution[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, resolution[1])
+        if camera_fps:
+            self.cap.set(cv2.CAP_PROP_FPS, camera_fps)
+        if buffer_size is not None:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+        return self.mode
+
+    @property
+    def mode(self):
+        size = self.frame_size or (0, 0)
+        return {
+            "fourcc": fourcc_to_str(self.cap.get(cv2.CAP_PROP_FOURCC)),
+            "width": size[0],
+            "height": size[1],
+            "fps": self.cap.get(cv2.CAP_PROP_FPS),
+            "buffer_size": int(self.cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+        }
+
+    def _read(self):
+        return self.cap.read()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+    @property
+    def frame_size(self):
+        return _capture_size(self.cap)
+
+    @property
+    def description(self):
+        return f"camera:{self.index}"
+
+
+class VideoFileSource(FrameSource):
+    def __init__(self, path, fps=None, loop=False) -> None:
+        super().__init__(fps)
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+
+    def _read(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+    @property
+    def media_fps(self):
+        return self.cap.get(cv2.CAP_PROP_FPS) or self.fps or 30.0
+
+    @property
+    def frame_size(self):
+        return _capture_size(self.cap)
+
+    @property
+    def description(self):
+        return f"file:{os.path.abspath(self.path)}"
+
+
+class ImageSequenceSource(FrameSource):
+    """Reads the images of a directory in file name order."""
+
+    def __init__(self, directory, fps=None, loop=False) -> None:
+        super().__init__(fps)
+        self.directory = directory
+        self.loop = loop
+        self.paths = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.index = 0
+
+    def _read(self):
+        if self.index >= len(self.paths):
+            if not self.loop or not self.paths:
+                return False, None
+            self.index = 0
+        frame = cv2.imread(self.paths[self.index])
+        self.index += 1
+        return frame is not None, frame
+
+    def isOpened(self):
+        return bool(self.paths)
+
+    @property
+    def frame_size(self):
+        frame = cv2.imread(self.paths[0]) if self.paths else None
+        return (frame.shape[1], frame.shape[0]) if frame is not None else None
+
+    @property
+    def description(self):
+        return f"images:{os.path.abspath(self.directory)}"
+
+
+class SyntheticSource(FrameSource):
+    """Generates moving test frames, ``frames=None`` never ends."""
+
+    def __init__(self, width=640, height=480, frames=None, fps=None) -> None:
+        super().__init__(fps)
+        self.width = width
+        self.height = height
+        self.frames = frames
+        self.index = 0
+        rng = np.random.default_rng(0)
+        self._pattern = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+    def _read(self):
+        if self.frames is not None and self.index >= self.frames:
+            return False, None
+        # every frame is a new array, the pipeline draws on frames in place
+        frame = np.roll(self._pattern, self.index * 4, axis=1)
+        self.index += 1
+        return True, frame
+
+    @property
+    def frame_size(self):
+        return self.width, self.height
+
+    @property
+    def description(self):
+        return f"synthetic:{self.width}x{self.height}"
+
+
+def open_source(spec="0", fps=None, loop=False, **camera_settings):
+    """Opens a frame source from a command line spec.
+
+    ``0`` or ``camera:0`` opens a camera, ``synthetic`` or ``synthetic:640x480``
+    generated frames, a directory an image sequence and anything else a video file.
+    ``camera_settings`` are passed on to CameraSource.
+    """
+    spec = str(spec)
+    if spec.isdigit():
+        return CameraSource(int(spec), fps, **camera_settings)
+    if spec.startswith("camera:"):
+        return CameraSource(int(spec.split(":", 1)[1]), fps, **camera_settings)
+    if spec == "synthetic" or spec.startswith("synthetic:"):
+        _, _, size = spec.partition(":")
+        width, height = (int(value) for value in size.split("x")) if size else (640, 480)
+        return SyntheticSource(width, height, fps=fps)
+    if os.path.isdir(spec):
+        return ImageSequenceSource(spec, fps, loop)
+    if os.path.isfile(spec):
+        return VideoFileSource(spec, fps, loop)
+    raise ValueError(f"Frame source {spec!r} is neither a camera, a directory nor a video file")
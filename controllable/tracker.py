@@ -0,0 +1,519 @@
+import sys
+import time
+import threading
+import traceback
+
+import cv2
+
+from . import calibration, drawing, filters, gestures, governor, hands, injection, landmarkers, metrics, profiles, sources
+from .capture import FrameGrabber
+from .mouse_interpolator import MouseInterpolator
+
+
+# seconds (with a visible hand) to get into each pose, and at most spent measuring it
+CALIBRATION_PREPARE = 1.5
+CALIBRATION_MAX_PHASE = 3.0
+# longest wait for a submitted frame's landmarks before moving on to the next frame
+RESULT_TIMEOUT = 1.0
+# screen the cursor moves in when there is no monitor to ask, e.g. with the mock injector
+DEFAULT_SCREEN_SIZE = (1920, 1080)
+
+
+def map_coordinate(coord, old_min=0.2, old_max=0.8):
+    coord = max(old_min, min(old_max, coord))
+    return (coord - old_min) / (old_max - old_min)
+
+def draw_landmarks_on_image(image, hand_landmarks_list):
+    """Draws (N, 21, 3) normalized hand landmarks onto the image in place and returns it."""
+    height, width = image.shape[:2]
+    return drawing.draw_hands(image, drawing.landmarks_to_pixels(hand_landmarks_list, width, height))
+
+class Tracker:
+    """Calibration and tracking, from captured frames to mouse input, without any UI.
+
+    ``on_frame`` receives the annotated preview frames, ``on_text`` the
+    instructions for the user and ``on_calibrated`` is called once
+    calibration is done. ``publisher`` (a FramePublisher) gets the same
+    frames as ``on_frame``. Without either nothing is drawn at all.
+    """
+
+    def __init__(self, source=None) -> None:
+        self.on_frame = None
+        self.publisher = None
+        self.on_text = None
+        self.on_calibrated = None
+        self._run_flag = True
+        self.calibrating = False
+        self.began_processing = False
+        # pinch distance in palm widths below which thumb and index finger touch
+        self.click_distance = None
+        # median distance of the calibration's pinches, None if unknown
+        self.pinch_distance = None
+        self.profile_user = None
+        self.profile_path = None
+        self.enable_dragging = False
+        self.only_hand = False
+        self.pointer_filter = filters.create_filter()
+        self.blank_canvas = drawing.BlankCanvas()
+        # replaced by a ReplayLandmarker factory when replaying a recording
+        self.landmarker_factory = landmarkers.Landmarker
+        # a replayed recording doesn't need the model file
+        self.download_model = True
+        # (width, height) the cursor moves in, None uses the first monitor or DEFAULT_SCREEN_SIZE without one
+        self.screen_size = None
+        # created and warmed up in the background, then shared by calibration and tracking
+        self.landmarker = None
+        self.landmarker_ready = threading.Event()
+        # the exception that stopped the landmarker from loading or running, if any
+        self.landmarker_error = None
+        # perf_counter() value startup times are measured from
+        self.started_at = time.perf_counter()
+        self.startup_times = {}
+        self.recorder = None
+        # keep nudging the click distance towards the pinches seen while in use
+        self.adapt_threshold = True
+        # picks the hand that controls the cursor when more than one is detected
+        self.hand_selector = hands.HandSelector()
+        # cursor updates per second, should match the display refresh rate
+        self.refresh_rate = 60.0
+        self.injector_name = "pynput"
+        # None runs detection on every frame
+        self.governor = governor.RateGovernor()
+        self.metrics = metrics.Metrics()
+        self.cap = source if source is not None else sources.CameraSource(0)
+        self.grabber = FrameGrabber(self.cap, lossless=not self.cap.live)
+        self.calibration_flag = threading.Event()
+        # notified whenever calibration_flag, landmarker_ready or _run_flag change
+        self._state_changed = threading.Condition()
+
+    def load_profile(self):
+        """Uses the saved calibration for this camera and user if there is one, returns whether it was found."""
+        profile = profiles.load_profile(self.cap.description, self.profile_user, self.profile_path)
+        if profile is None:
+            return False
+        self.click_distance = profile["click_distance"]
+        self.pinch_distance = profile.get("touching")
+        self._set(self.calibration_flag)
+        return True
+
+    def _startup_time(self, name):
+        self.startup_times[name] = time.perf_counter() - self.started_at
+        print(f"{name.replace('_', ' ').capitalize()} after {self.startup_times[name] * 1000:.0f} ms")
+
+    def _load_landmarker(self):
+        landmarker = None
+        try:
+            if self.download_model:
+                landmarkers.ensure_model()
+            landmarker = self.landmarker_factory()
+            self._startup_time("landmarker_loaded")
+            landmarker.warm_up(self.cap.frame_size)
+        except Exception as error:
+            if landmarker is not None:
+                landmarker.close()
+            self._landmarker_failed(error, "Couldn't load the hand tracking model")
+            return
+        self.landmarker = landmarker
+        self._startup_time("landmarker_ready")
+        self._set(self.landmarker_ready)
+
+    def _landmarker_failed(self, error, message):
+        """Reports an error of the landmarker and wakes up everything that waits for it."""
+        traceback.print_exception(type(error), error, error.__traceback__)
+        self._text(f"{message}: {error}")
+        with self._state_changed:
+            self.landmarker_error = error
+            self._state_changed.notify_all()
+
+    def _landmarker_settled(self):
+        return self.landmarker_ready.is_set() or self.landmarker_error is not None
+
+    def _set(self, event):
+        event.set()
+        with self._state_changed:
+            self._state_changed.notify_all()
+
+    def _wait_until(self, predicate):
+        """Sleeps until ``predicate()`` is true or the tracker is stopped, returns ``predicate()``."""
+        with self._state_changed:
+            self._state_changed.wait_for(lambda: not self._run_flag or predicate())
+        return predicate()
+
+    def run(self):
+        self._loader = threading.Thread(target=self._load_landmarker, daemon=True)
+        self._loader.start()
+
+        # a loaded profile goes straight to tracking, the preview keeps running until the landmarker is ready
+        while not self.calibrating and not (self.calibration_flag.is_set() and self.landmarker_ready.is_set()) \
+                and self.landmarker_error is None and self._run_flag:
+            packet = self.grabber.read()
+            if packet is None:
+                if self.grabber.finished:
+                    break
+                continue
+            frame = packet[2]
+            if "first_frame" not in self.startup_times:
+                self._startup_time("first_frame")
+
+            if self.showing:
+                self._show(self.blank_canvas.get(frame.shape) if self.only_hand else frame)
+
+        # waits until calibration is finished
+        self._wait_until(lambda: self.calibration_flag.is_set() or self.landmarker_error is not None)
+
+        if not self._wait_until(self._landmarker_settled) or self.landmarker_error is not None:
+            self._loader.join()
+            if self.landmarker is not None:
+                self.landmarker.close()
+            return
+
+        if self.screen_size is None:
+            self.screen_size = self._monitor_size()
+        monitor_width, monitor_height = self.screen_size
+
+        hand_landmarker = self.landmarker
+        injector = injection.create_injector(self.injector_name)
+        mouse_interpolator = MouseInterpolator(injector, rate=self.refresh_rate, metrics=self.metrics)
+        gesture_engine = gestures.GestureEngine(self.click_distance, normalize=True)
+        adapter = None
+        if self.adapt_threshold and self.pinch_distance is not None:
+            adapter = calibration.ThresholdAdapter(self.click_distance, self.pinch_distance)
+        self.hand_selector.reset()
+        perf = self.metrics
+        # frame id -> capture time of the submitted frames, latencies and the
+        # cursor prediction are measured from it, not from the frame timestamps
+        captured = {}
+        # (landmarks, hand, touching) of the last detection with a hand, drawn on frames the governor skips
+        overlay = None
+
+        while self._run_flag:
+            start = perf.now()
+            packet = self.grabber.read()
+            if packet is None:
+                if self.grabber.finished:
+                    break
+                continue
+            frame_id, timestamp, frame, captured_at = packet
+            perf.record("capture_wait", start)
+            if perf.enabled:
+                perf.tick("capture")
+                perf.record_duration("frame_age", time.monotonic() - captured_at)
+                perf.gauge("dropped_frames", self.grabber.dropped)
+                perf.gauge("inference_in_flight", hand_landmarker.in_flight)
+                perf.gauge("inference_skipped", hand_landmarker.stats["skipped"])
+                if self.governor is not None:
+                    perf.gauge("governor_target_fps", self.governor.target_fps or 0)
+            try:
+                height, width, _ = frame.shape
+            except AttributeError:
+                print("No camera detected.")
+                sys.exit(1)
+            skipped = False
+            try:
+                if self.governor is not None and not self.governor.should_infer(captured_at):
+                    skipped = True
+                elif hand_landmarker.detect_async(frame, frame_id, timestamp):
+                    captured[frame_id] = captured_at
+                    if len(captured) > 64:
+                        # results that never came back
+                        del captured[next(iter(captured))]
+
+                # everything below works on the frame the detection was computed on.
+                # Returns right away when nothing was submitted.
+                detection = hand_landmarker.wait_result(RESULT_TIMEOUT)
+            except RuntimeError as error:
+                self._landmarker_failed(error, "Hand tracking stopped")
+                break
+            if detection is None:
+                if getattr(hand_landmarker, "finished", False):
+                    break
+                if skipped and self.showing:
+                    # the governor only skips while the hand is still or gone, so the
+                    # last landmarks still fit and the preview keeps the capture rate
+                    start = perf.now()
+                    if overlay is not None:
+                        frame = self._annotate(frame, *overlay)
+                    elif self.only_hand:
+                        frame = self.blank_canvas.get(frame.shape)
+                    perf.record("draw", start)
+                    self._show(frame, captured_at=captured_at)
+                continue
+            if self.recorder is not None:
+                self.recorder.write(detection)
+            frame, timestamp = detection.frame, detection.timestamp
+            captured_at = captured.pop(detection.frame_id, captured_at)
+            perf.tick("inference")
+            perf.record_duration("inference", detection.latency)
+
+            start = perf.now()
+            hand = self.hand_selector.update(timestamp, detection.landmarks, detection.handedness)
+            landmarks = detection.landmarks[hand] if hand is not None else None
+            gesture_engine.enable_dragging = self.enable_dragging
+            events = gesture_engine.step(timestamp, landmarks)
+            if adapter is not None and landmarks is not None:
+                gesture_engine.click_distance = adapter.update(gesture_engine.distance)
+                perf.gauge("click_distance", round(gesture_engine.click_distance, 3))
+            if self.governor is not None:
+                self.governor.update(captured_at, landmarks)
+            perf.record("gestures", start)
+
+            if landmarks is not None:
+                pointer_tip = landmarks[gestures.INDEX_FINGER_TIP]
+                mapped_x = map_coordinate(pointer_tip[0])
+                mapped_y = map_coordinate(pointer_tip[1])
+                monitor_x = int(mapped_x * monitor_width)
+                monitor_y = int(mapped_y * monitor_height)
+
+                if self.showing:
+                    start = perf.now()
+                    overlay = (detection.landmarks, hand, gesture_engine.touching)
+                    frame = self._annotate(frame, *overlay)
+                    perf.record("draw", start)
+
+                smoothed_x, smoothed_y = self.pointer_filter.update(monitor_x, monitor_y, timestamp)
+                if self.began_processing:
+                    mouse_interpolator.move_to(int(smoothed_x), int(smoothed_y), captured_at)
+                    if perf.enabled:
+                        perf.record_duration("end_to_end", time.monotonic() - captured_at)
+            else:
+                overlay = None
+                if timestamp > gesture_engine.last_seen + gesture_engine.lost_timeout:
+                    # don't smooth across the gap when the hand comes back
+                    self.pointer_filter.reset()
+
+                if self.only_hand and self.showing:
+                    frame = self.blank_canvas.get(frame.shape)
+
+            if self.began_processing and events:
+                start = perf.now()
+                try:
+                    for event in events:
+                        if event.kind == gestures.CLICK:
+                            injector.click(injection.LEFT)
+                        elif event.kind == gestures.PRESS:
+                            injector.press(injection.LEFT)
+                        elif event.kind == gestures.RELEASE:
+                            injector.release(injection.LEFT)
+                except RuntimeError:
+                    pass
+                perf.record("inject", start)
+                perf.count("gesture_events", len(events))
+
+            if self.showing:
+                self._show(frame, detection, captured_at)
+
+        hand_landmarker.close()
+        mouse_interpolator.stop()
+        try:
+            injector.release_all()
+        except RuntimeError:
+            pass
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.publisher is not None:
+            self.publisher.close()
+        stats = self.grabber.stats
+        print(f"Captured {stats['captured']} frames, dropped {stats['dropped']} ({stats['failed_reads']} failed reads)")
+        stats = hand_landmarker.stats
+        print(f"Inferred {stats['completed']} frames, skipped {stats['skipped']} while busy, "
+              f"mean inference latency {stats['mean_latency'] * 1000:.1f} ms")
+        stats = injector.stats
+        print(f"Sent {stats['sent']} input events, suppressed {stats['suppressed']} redundant ones "
+              f"and coalesced {stats['coalesced']} moves")
+
+    def _monitor_size(self):
+        if self.injector_name == "mock":
+            return DEFAULT_SCREEN_SIZE
+        from screeninfo import ScreenInfoError, get_monitors
+
+        try:
+            monitor = get_monitors()[0]
+        except (ScreenInfoError, IndexError) as error:
+            print(f"Couldn't find a monitor ({error}), using {DEFAULT_SCREEN_SIZE[0]}x{DEFAULT_SCREEN_SIZE[1]}")
+            return DEFAULT_SCREEN_SIZE
+        return monitor.width, monitor.height
+
+    def stop(self):
+        with self._state_changed:
+            self._run_flag = False
+            self._state_changed.notify_all()
+        self.calibrating = False
+        if getattr(self, 'calibration_thread', False) and self.calibration_thread.is_alive():
+            self.calibration_thread.join()
+        self.grabber.stop()
+        self.cap.release()
+
+    def _annotate(self, frame, hand_landmarks, hand, touching):
+        height, width = frame.shape[:2]
+        if self.only_hand:
+            frame = self.blank_canvas.get(frame.shape)
+        color = (0, 255, 0) if touching else (0, 0, 255)
+
+        # landmarks are converted to pixels once and drawn in place
+        pixels = drawing.landmarks_to_pixels(hand_landmarks, width, height)
+        drawing.draw_hands(frame, pixels)
+
+        pointer_pixel = tuple(pixels[hand][gestures.INDEX_FINGER_TIP].tolist())
+        thumb_pixel = tuple(pixels[hand][gestures.THUMB_TIP].tolist())
+        cv2.circle(frame, pointer_pixel, 5, color, -1)
+        cv2.circle(frame, thumb_pixel, 5, color, -1)
+        cv2.line(frame, pointer_pixel, thumb_pixel, color, 2)
+        return frame
+
+    @property
+    def showing(self):
+        return self.on_frame is not None or self.publisher is not None
+
+    def _show(self, frame, detection=None, captured_at=0.0):
+        if self.on_frame is not None:
+            self.on_frame(frame)
+        if self.publisher is not None:
+            if detection is None:
+                self.publisher.publish(frame, timestamp=captured_at)
+            else:
+                self.publisher.publish(frame, detection.frame_id, captured_at, detection.landmarks,
+                                       detection.handedness)
+
+    def _text(self, text):
+        if self.on_text is not None:
+            self.on_text(text)
+
+    def _calibrated(self):
+        if self.on_calibrated is not None:
+            self.on_calibrated()
+
+    def _calibrate_thread(self):
+        time.sleep(0.1)
+
+        if not self._landmarker_settled():
+            self._text("Loading the hand tracking model...")
+        if not self._wait_until(self._landmarker_settled) or self.landmarker_error is not None:
+            return
+        hand_landmarker = self.landmarker
+
+        calibration_time = 0.0
+        last_hand_time = None
+
+        estimator = calibration.CalibrationEstimator()
+        phase = 0
+        phase_start = 0.0
+        retrying = False
+        self.hand_selector.reset()
+
+        while self._run_flag:
+            packet = self.grabber.read()
+            if packet is None:
+                if self.grabber.finished:
+                    break
+                continue
+            frame_id, timestamp, frame, captured_at = packet
+
+            try:
+                height, width, _ = frame.shape
+            except AttributeError:
+                print("No camera detected.")
+                sys.exit(1)
+
+            try:
+                hand_landmarker.detect_async(frame, frame_id, timestamp)
+                detection = hand_landmarker.wait_result(RESULT_TIMEOUT)
+            except ValueError:
+                continue
+            except RuntimeError as error:
+                self._landmarker_failed(error, "Hand tracking stopped")
+                return
+            if detection is None:
+                if getattr(hand_landmarker, "finished", False):
+                    break
+                continue
+            if self.recorder is not None:
+                self.recorder.write(detection)
+            frame = detection.frame
+
+            try:
+                hand = self.hand_selector.update(detection.timestamp, detection.landmarks, detection.handedness)
+                if hand is not None:
+                    if self.showing:
+                        if self.only_hand:
+                            frame = self.blank_canvas.get(frame.shape)
+                        frame = draw_landmarks_on_image(frame, detection.landmarks)
+
+                    distance = float(gestures.pinch_distance(detection.landmarks[hand], normalize=True))
+
+                    # only time with a visible hand counts, on the clock of the frames
+                    if last_hand_time is not None:
+                        calibration_time += detection.timestamp - last_hand_time
+                    last_hand_time = detection.timestamp
+                    elapsed_time = calibration_time - phase_start
+
+                    # every measuring phase ends as soon as the estimate is good enough
+                    if phase == 0:
+                        countdown = int(CALIBRATION_PREPARE - elapsed_time) + 1
+                        self._text(f"{'That was unclear, once more. ' if retrying else ''}Bring your thumb tip and "
+                                   f"pointer tip close (but not touching) in {countdown} seconds")
+                        done = elapsed_time >= CALIBRATION_PREPARE
+                    elif phase == 1:
+                        self._text("Measuring not touching position...")
+                        estimator.add(distance, pinched=False)
+                        done = len(estimator.open) >= estimator.min_samples or elapsed_time >= CALIBRATION_MAX_PHASE
+                    elif phase == 2:
+                        countdown = int(CALIBRATION_PREPARE - elapsed_time) + 1
+                        self._text(f"Touch your thumb tip and pointer tip together in {countdown} seconds")
+                        done = elapsed_time >= CALIBRATION_PREPARE
+                    else:
+                        self._text("Measuring touching position...")
+                        estimator.add(distance, pinched=True)
+                        done = estimator.confident() or elapsed_time >= CALIBRATION_MAX_PHASE
+                    if done:
+                        phase += 1
+                        phase_start = calibration_time
+
+                    if phase == 4:
+                        click_distance, touching_threshold, not_touching_threshold = estimator.result()
+                        if not estimator.confident():
+                            # a bad calibration would be saved and loaded on every start, measure again instead
+                            print(f"Calibration uncertain after {calibration_time:.1f} s (touching median "
+                                  f"{touching_threshold:.4f}, not touching median {not_touching_threshold:.4f}), "
+                                  f"starting over")
+                            estimator = calibration.CalibrationEstimator()
+                            phase = 0
+                            retrying = True
+                            continue
+
+                        self._text("Calibration completed! Press the start button to continue.")
+                        print(f"\n\nCalibration complete after {calibration_time:.1f} s! Click Distance: {click_distance:.4f}")
+                        print(f"Touching median: {touching_threshold:.4f}, Not touching median: {not_touching_threshold:.4f}")
+                        self.click_distance = click_distance
+                        self.pinch_distance = touching_threshold
+                        profiles.save_profile(self.cap.description, {
+                            "click_distance": click_distance,
+                            "touching": touching_threshold,
+                            "not_touching": not_touching_threshold,
+                        }, self.profile_user, self.profile_path)
+                        self._set(self.calibration_flag)
+                        self._calibrated()
+                        return
+
+                    if self.showing:
+                        self._show(frame, detection, captured_at)
+                else:
+                    self._text("Couldn't detect hand.")
+                    if self.showing:
+                        self._show(self.blank_canvas.get(frame.shape) if self.only_hand else frame, detection,
+                                   captured_at)
+
+
+            except (AttributeError, IndexError):
+                pass
+
+
+        self.click_distance = estimator.result()[0]
+        self._set(self.calibration_flag)
+        self._calibrated()
+        return
+
+    def calibrate(self):
+        if not self.calibrating and (not hasattr(self, 'calibration_thread') or not self.calibration_thread.is_alive()):
+            self.calibrating = True
+            self.calibration_thread = threading.Thread(target=self._calibrate_thread)
+            self.calibration_thread.start()
\ No newline at end of file
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from controllable.calibration import ThresholdAdapter
+
+
+def tap_stream(taps, pinch_frames, pinch=0.3, open_=1.0, ramp=4, rest=20, noise=0.01, seed=0):
+    """Pinch distances of ``taps`` taps held for ``pinch_frames`` frames, with the fingers closing and opening in between."""
+    rng = np.random.default_rng(seed)
+    closing = np.linspace(open_, pinch, ramp + 2)[1:-1]
+    tap = np.concatenate((np.full(rest, open_), closing, np.full(pinch_frames, pinch), closing[::-1]))
+    return np.tile(tap, taps) + rng.normal(0, noise, len(tap) * taps)
+
+
+@pytest.mark.parametrize("pinch_frames", [3, 5, 8])
+def test_threshold_stays_put_on_stationary_taps(pinch_frames):
+    adapter = ThresholdAdapter(0.75, 0.3)
+    history = [adapter.update(distance) for distance in tap_stream(400, pinch_frames)]
+    assert adapter.adaptations > 50
+    # the frames of closing and opening fingers don't ratchet it upwards
+    assert abs(history[-1] - 0.75) < 0.03
+    assert max(history) - min(history) < 0.05
+
+
+@pytest.mark.parametrize("drift", [0.1, -0.05])
+def test_threshold_follows_drift(drift):
+    adapter = ThresholdAdapter(0.75, 0.3)
+    for distance in tap_stream(400, 5, pinch=0.3 + drift):
+        adapter.update(distance)
+    assert abs(adapter.click_distance - (0.75 + drift)) < 0.03